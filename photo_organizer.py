@@ -9,6 +9,12 @@ from datetime import datetime
 import yaml
 import logging
 
+# Prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 from src.organizer import PhotoOrganizer
 from src.location import LocationIntelligence
 from src.cache import GeocodingCache
@@ -32,7 +38,7 @@ def load_config(config_path: Path = None) -> dict:
 
     try:
         with open(config_path, 'r') as f:
-            return yaml.safe_load(f)
+            return yaml.load(f, Loader=_YamlLoader)
     except FileNotFoundError:
         logger.warning(f"Config file not found: {config_path}, using defaults")
         return {}
@@ -316,20 +322,22 @@ Examples:
         filename_pattern=filename_pattern
     )
 
-    # Preview only mode
-    if args.preview_only:
-        organizer.print_preview(limit=args.preview_only)
-        sys.exit(0)
-
-    # Show preview and confirm
-    require_confirmation = config.get('safety', {}).get('require_confirmation', True)
-    if require_confirmation and not args.yes:
-        if not confirm_operation(organizer, preview_count=10):
-            print("\nOperation cancelled.")
+    # Every exit below goes through the finally clause, which commits
+    # buffered geocoding results
+    try:
+        # Preview only mode
+        if args.preview_only:
+            organizer.print_preview(limit=args.preview_only)
             sys.exit(0)
 
-    # Run organizer
-    try:
+        # Show preview and confirm
+        require_confirmation = config.get('safety', {}).get('require_confirmation', True)
+        if require_confirmation and not args.yes:
+            if not confirm_operation(organizer, preview_count=10):
+                print("\nOperation cancelled.")
+                sys.exit(0)
+
+        # Run organizer
         stats = organizer.organize()
 
         # Print summary
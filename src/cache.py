@@ -1,18 +1,87 @@
 """
 SQLite cache for geocoding results.
 """
+import json
+import os
 import sqlite3
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Tuple
-from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Coordinates are keyed on a fixed micro-degree grid so every supported
+# precision (up to 6 decimal places) maps to one exact integer cell
+_CELL_SCALE = 10 ** 6
+_LAT_OFFSET = 90 * _CELL_SCALE
+_LON_OFFSET = 180 * _CELL_SCALE
+_LON_SPAN = 2 * _LON_OFFSET + 1
+
+
+def _encode_cell(lat: float, lon: float) -> int:
+    """Encode a coordinate as a single integer grid cell."""
+    lat_idx = int(round(lat * _CELL_SCALE)) + _LAT_OFFSET
+    lon_idx = int(round(lon * _CELL_SCALE)) + _LON_OFFSET
+    return lat_idx * _LON_SPAN + lon_idx
+
+
 class GeocodingCache:
     """SQLite-based cache for geocoding results."""
 
+    # Maximum number of entries kept in the in-memory LRU tier
+    MEMORY_CACHE_SIZE = 4096
+
+    # Buffered writes are committed once this many are pending
+    FLUSH_EVERY = 64
+
+    # Bumped whenever the table layout changes (stored in PRAGMA user_version)
+    SCHEMA_VERSION = 1
+
+    _CREATE_TABLE_SQL = """
+        CREATE TABLE IF NOT EXISTS geocoding_cache (
+            cell INTEGER PRIMARY KEY,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            location_name TEXT NOT NULL,
+            granularity TEXT NOT NULL,
+            country TEXT,
+            state TEXT,
+            city TEXT,
+            cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+
+    _GET_SQL = """
+        SELECT location_name, granularity, country, state, city, cached_at
+        FROM geocoding_cache
+        WHERE cell = ?
+        LIMIT 1
+    """
+
+    # Keys per IN (...) list, kept under SQLite's host parameter limit
+    _BATCH_SIZE = 500
+
+    _GET_MANY_SQL = """
+        SELECT cell, location_name, granularity, country, state, city, cached_at
+        FROM geocoding_cache
+        WHERE cell IN ({placeholders})
+    """
+
+    _NEIGHBORS_SQL = """
+        SELECT latitude, longitude, location_name, granularity, country, state, city
+        FROM geocoding_cache
+        WHERE cell IN ({placeholders})
+    """
+
+    # cached_at is filled in by the column default
+    _SET_SQL = """
+        INSERT OR REPLACE INTO geocoding_cache
+        (cell, latitude, longitude, location_name, granularity, country, state, city)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
     def __init__(self, cache_path: Path = None):
         """
         Initialize the geocoding cache.
@@ -25,37 +94,151 @@ class GeocodingCache:
 
         self.cache_path = cache_path
         self.conn: Optional[sqlite3.Connection] = None
+
+        # Sidecar snapshot of the in-memory tier for a warm start next run
+        in_memory = str(cache_path) == ':memory:'
+        self.hot_path: Optional[Path] = None if in_memory else Path(cache_path).with_suffix('.hot')
+
+        # In-memory LRU tier in front of SQLite, keyed by grid cell
+        self._mem: OrderedDict = OrderedDict()
+        self._mem_cap = self.MEMORY_CACHE_SIZE
+
+        # Writes not yet committed to SQLite: cell -> (result, parameters for _SET_SQL)
+        self._dirty: Dict[int, Tuple[dict, tuple]] = {}
+
+        # Freshness is checked before connecting, which touches the database files
+        hot_entries = self._read_hot()
+
         self._initialize_db()
 
+        for key, result in hot_entries:
+            self._remember(key, result)
+
+    @staticmethod
+    def cell_key(lat: float, lon: float, precision: int = 4) -> int:
+        """
+        Get the integer cache key for a coordinate.
+
+        Args:
+            lat: Latitude
+            lon: Longitude
+            precision: Decimal places to round coordinates to (at most 6)
+
+        Returns:
+            Grid cell identifier shared by all coordinates that round together
+        """
+        return _encode_cell(round(lat, precision), round(lon, precision))
+
     def _initialize_db(self):
         """Create the database and tables if they don't exist."""
         self.conn = sqlite3.connect(str(self.cache_path))
-        cursor = self.conn.cursor()
 
-        # Create geocoding cache table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS geocoding_cache (
-                latitude REAL NOT NULL,
-                longitude REAL NOT NULL,
-                location_name TEXT NOT NULL,
-                granularity TEXT NOT NULL,
-                country TEXT,
-                state TEXT,
-                city TEXT,
-                cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (latitude, longitude)
-            )
+        # The cache is rebuildable, so trade fsync-per-commit durability for speed
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-65536;
+            PRAGMA mmap_size=268435456;
         """)
 
-        # Create index for faster lookups
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_coords
-            ON geocoding_cache(latitude, longitude)
-        """)
+        cursor = self.conn.cursor()
+
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version < self.SCHEMA_VERSION:
+            self._migrate(cursor, version)
+
+        # Create geocoding cache table
+        cursor.execute(self._CREATE_TABLE_SQL)
+        cursor.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
 
         self.conn.commit()
+
+        # Reused for every lookup to avoid per-call cursor allocation
+        self._get_cur = self.conn.cursor()
+
         logger.debug(f"Initialized geocoding cache at {self.cache_path}")
 
+    def _read_hot(self) -> List[Tuple[int, dict]]:
+        """
+        Read the hot-cell snapshot if it is newer than the database.
+
+        Returns:
+            List of (cell, result) pairs, least recently used first
+        """
+        if self.hot_path is None or not self.hot_path.exists():
+            return []
+
+        try:
+            hot_mtime = self.hot_path.stat().st_mtime
+            for db_file in (Path(self.cache_path), Path(f"{self.cache_path}-wal")):
+                if db_file.exists() and db_file.stat().st_mtime > hot_mtime:
+                    logger.debug(f"Ignoring stale hot cache {self.hot_path}")
+                    return []
+
+            with open(self.hot_path, 'r') as f:
+                entries = [(int(key), result) for key, result in json.load(f)]
+
+        except (OSError, ValueError, TypeError) as e:
+            logger.debug(f"Could not read hot cache {self.hot_path}: {e}")
+            return []
+
+        logger.debug(f"Loaded {len(entries)} hot cache entries")
+        return entries[-self._mem_cap:]
+
+    def _write_hot(self):
+        """Snapshot the in-memory tier next to the database."""
+        if self.hot_path is None:
+            return
+
+        try:
+            if not self._mem:
+                self.hot_path.unlink(missing_ok=True)
+                return
+
+            temp_path = self.hot_path.with_suffix('.hot.tmp')
+            with open(temp_path, 'w') as f:
+                json.dump(list(self._mem.items()), f)
+            os.replace(temp_path, self.hot_path)
+
+        except OSError as e:
+            logger.debug(f"Could not write hot cache {self.hot_path}: {e}")
+
+    def _migrate(self, cursor: sqlite3.Cursor, version: int):
+        """
+        Upgrade a cache created by an older release to the current schema.
+
+        Args:
+            cursor: Cursor on the open connection
+            version: Schema version found in the database
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'geocoding_cache'"
+        ).fetchone()
+        if not exists:
+            return
+
+        # Version 0 keyed rows on a (latitude, longitude) REAL primary key
+        if version == 0:
+            logger.info("Migrating geocoding cache to integer cell keys")
+            cursor.execute("ALTER TABLE geocoding_cache RENAME TO geocoding_cache_v0")
+            cursor.execute(self._CREATE_TABLE_SQL)
+            rows = cursor.execute("""
+                SELECT latitude, longitude, location_name, granularity,
+                       country, state, city, cached_at
+                FROM geocoding_cache_v0
+            """).fetchall()
+            cursor.executemany(
+                """
+                INSERT OR REPLACE INTO geocoding_cache
+                (cell, latitude, longitude, location_name, granularity,
+                 country, state, city, cached_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [(_encode_cell(row[0], row[1]),) + tuple(row) for row in rows]
+            )
+            cursor.execute("DROP TABLE geocoding_cache_v0")
+
     def get(self, lat: float, lon: float, precision: int = 4) -> Optional[dict]:
         """
         Get cached geocoding result.
@@ -72,20 +255,25 @@ class GeocodingCache:
             return None
 
         # Round coordinates for cache lookup (allows nearby locations to share cache)
-        lat_rounded = round(lat, precision)
-        lon_rounded = round(lon, precision)
+        key = self.cell_key(lat, lon, precision)
 
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT location_name, granularity, country, state, city, cached_at
-            FROM geocoding_cache
-            WHERE latitude = ? AND longitude = ?
-        """, (lat_rounded, lon_rounded))
+        # Check the in-memory tier before touching SQLite
+        if key in self._mem:
+            self._mem.move_to_end(key)
+            logger.debug(f"Cache hit for ({lat}, {lon})")
+            return self._mem[key]
 
-        row = cursor.fetchone()
+        if key in self._dirty:
+            result = self._dirty[key][0]
+            self._remember(key, result)
+            return result
+
+        self._get_cur.execute(self._GET_SQL, (key,))
+
+        row = self._get_cur.fetchone()
         if row:
             logger.debug(f"Cache hit for ({lat}, {lon})")
-            return {
+            result = {
                 'location_name': row[0],
                 'granularity': row[1],
                 'country': row[2],
@@ -93,14 +281,157 @@ class GeocodingCache:
                 'city': row[4],
                 'cached_at': row[5]
             }
+            self._remember(key, result)
+            return result
 
         logger.debug(f"Cache miss for ({lat}, {lon})")
         return None
 
+    def get_many(self, cells: Iterable[int]) -> Dict[int, dict]:
+        """
+        Look up many grid cells at once, warming the in-memory tier.
+
+        Args:
+            cells: Cache keys from cell_key()
+
+        Returns:
+            Dictionary mapping each cached cell to its location data
+        """
+        if self.conn is None:
+            return {}
+
+        keys = list(dict.fromkeys(cells))
+        found: Dict[int, dict] = {}
+        missing: List[int] = []
+        for key in keys:
+            if key in self._mem:
+                found[key] = self._mem[key]
+            elif key in self._dirty:
+                found[key] = self._dirty[key][0]
+                self._remember(key, found[key])
+            else:
+                missing.append(key)
+
+        for start in range(0, len(missing), self._BATCH_SIZE):
+            batch = missing[start:start + self._BATCH_SIZE]
+            self._get_cur.execute(
+                self._GET_MANY_SQL.format(placeholders=','.join('?' * len(batch))),
+                batch
+            )
+            for row in self._get_cur.fetchall():
+                result = {
+                    'location_name': row[1],
+                    'granularity': row[2],
+                    'country': row[3],
+                    'state': row[4],
+                    'city': row[5],
+                    'cached_at': row[6]
+                }
+                found[row[0]] = result
+                self._remember(row[0], result)
+
+        logger.debug(f"Batch cache lookup: {len(found)} of {len(keys)} cells cached")
+        return found
+
+    def get_with_neighbors(self, lat: float, lon: float, precision: int = 4) -> Optional[dict]:
+        """
+        Get cached geocoding result, falling back to the 8 adjacent grid cells.
+
+        GPS jitter can push two photos taken at the same spot across a cell
+        boundary. A neighbor hit is remembered in the in-memory tier only, so
+        later lookups are direct hits but a derived entry can never become
+        the neighbor of the next cell over (names would creep across borders).
+
+        Args:
+            lat: Latitude
+            lon: Longitude
+            precision: Decimal places to round coordinates to
+
+        Returns:
+            Dictionary with location data or None if neither the cell nor its neighbors are cached
+        """
+        result = self.get(lat, lon, precision)
+        if result is not None or self.conn is None:
+            return result
+
+        key = self.cell_key(lat, lon, precision)
+        step = 10 ** (6 - precision)
+        neighbors = [
+            key + d_lat * step * _LON_SPAN + d_lon * step
+            for d_lat in (-1, 0, 1)
+            for d_lon in (-1, 0, 1)
+            if d_lat or d_lon
+        ]
+
+        self._get_cur.execute(
+            self._NEIGHBORS_SQL.format(placeholders=','.join('?' * len(neighbors))),
+            neighbors
+        )
+        rows = self._get_cur.fetchall()
+
+        # Buffered writes are not in SQLite yet; their parameters have the same layout
+        rows.extend(self._dirty[cell][1][1:] for cell in neighbors if cell in self._dirty)
+        if not rows:
+            return None
+
+        # Prefer the closest neighbor (edge-adjacent over diagonal)
+        row = min(rows, key=lambda r: (r[0] - lat) ** 2 + (r[1] - lon) ** 2)
+        logger.debug(f"Neighbor cache hit for ({lat}, {lon})")
+        result = {
+            'location_name': row[2],
+            'granularity': row[3],
+            'country': row[4],
+            'state': row[5],
+            'city': row[6],
+            'cached_at': None
+        }
+        self._remember(key, result)
+        return result
+
+    def _remember(self, key: int, result: dict):
+        """Store a result in the in-memory tier, evicting the oldest entry if full."""
+        self._mem[key] = result
+        self._mem.move_to_end(key)
+        if len(self._mem) > self._mem_cap:
+            self._mem.popitem(last=False)
+
+    def _make_row(self, lat: float, lon: float, location_data: dict,
+                  precision: int) -> Tuple[int, dict, tuple]:
+        """
+        Build the cache key, in-memory result and SQL parameters for an entry.
+
+        Returns:
+            Tuple of (key, result dictionary, parameters for _SET_SQL)
+        """
+        lat_rounded = round(lat, precision)
+        lon_rounded = round(lon, precision)
+        key = _encode_cell(lat_rounded, lon_rounded)
+        result = {
+            'location_name': location_data.get('location_name', ''),
+            'granularity': location_data.get('granularity', ''),
+            'country': location_data.get('country', ''),
+            'state': location_data.get('state', ''),
+            'city': location_data.get('city', ''),
+            'cached_at': None  # Assigned by SQLite, not read back on write
+        }
+        params = (
+            key,
+            lat_rounded,
+            lon_rounded,
+            result['location_name'],
+            result['granularity'],
+            result['country'],
+            result['state'],
+            result['city']
+        )
+        return key, result, params
+
     def set(self, lat: float, lon: float, location_data: dict, precision: int = 4):
         """
         Store geocoding result in cache.
 
+        The write is buffered and committed together with others (see flush()).
+
         Args:
             lat: Latitude
             lon: Longitude
@@ -110,32 +441,47 @@ class GeocodingCache:
         if self.conn is None:
             return
 
-        lat_rounded = round(lat, precision)
-        lon_rounded = round(lon, precision)
+        key, result, params = self._make_row(lat, lon, location_data, precision)
+        self._dirty[key] = (result, params)
+        self._remember(key, result)
+        logger.debug(f"Cached geocoding result for ({lat}, {lon})")
 
-        cursor = self.conn.cursor()
+        if len(self._dirty) >= self.FLUSH_EVERY:
+            self.flush()
 
-        try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO geocoding_cache
-                (latitude, longitude, location_name, granularity, country, state, city, cached_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                lat_rounded,
-                lon_rounded,
-                location_data.get('location_name', ''),
-                location_data.get('granularity', ''),
-                location_data.get('country', ''),
-                location_data.get('state', ''),
-                location_data.get('city', ''),
-                datetime.now().isoformat()
-            ))
+    def set_many(self, entries: Iterable[Tuple[float, float, dict]], precision: int = 4):
+        """
+        Store several geocoding results in a single transaction.
+
+        Args:
+            entries: Iterable of (latitude, longitude, location_data) tuples
+            precision: Decimal places to round coordinates to
+        """
+        if self.conn is None:
+            return
+
+        for lat, lon, data in entries:
+            key, result, params = self._make_row(lat, lon, data, precision)
+            self._dirty[key] = (result, params)
+            self._remember(key, result)
+
+        self.flush()
 
+    def flush(self):
+        """Commit buffered writes to SQLite in one transaction."""
+        if self.conn is None or not self._dirty:
+            return
+
+        rows = [params for _, params in self._dirty.values()]
+        self._dirty.clear()
+
+        try:
+            self.conn.executemany(self._SET_SQL, rows)
             self.conn.commit()
-            logger.debug(f"Cached geocoding result for ({lat}, {lon})")
+            logger.debug(f"Committed {len(rows)} geocoding results")
 
         except sqlite3.Error as e:
-            logger.error(f"Error caching geocoding result: {e}")
+            logger.error(f"Error caching geocoding results: {e}")
             self.conn.rollback()
 
     def get_stats(self) -> dict:
@@ -148,6 +494,7 @@ class GeocodingCache:
         if self.conn is None:
             return {'total_entries': 0}
 
+        self.flush()
         cursor = self.conn.cursor()
 
         cursor.execute("SELECT COUNT(*) FROM geocoding_cache")
@@ -173,6 +520,8 @@ class GeocodingCache:
         cursor = self.conn.cursor()
         cursor.execute("DELETE FROM geocoding_cache")
         self.conn.commit()
+        self._dirty.clear()
+        self._mem.clear()
         logger.info("Cleared all cache entries")
 
     def clear_unknown(self) -> int:
@@ -185,25 +534,48 @@ class GeocodingCache:
         if self.conn is None:
             return 0
 
-        cursor = self.conn.cursor()
-
-        # Count how many will be deleted
-        cursor.execute("SELECT COUNT(*) FROM geocoding_cache WHERE location_name = 'Unknown'")
-        count = cursor.fetchone()[0]
+        self.flush()
 
-        # Delete Unknown entries
-        cursor.execute("DELETE FROM geocoding_cache WHERE location_name = 'Unknown'")
+        # rowcount is SQLite's changes(), so no separate COUNT(*) pass is needed
+        cursor = self.conn.execute("DELETE FROM geocoding_cache WHERE location_name = 'Unknown'")
+        count = cursor.rowcount
         self.conn.commit()
+        self._mem.clear()
 
         logger.info(f"Cleared {count} 'Unknown' cache entries")
         return count
 
+    def reader(self) -> sqlite3.Connection:
+        """
+        Open an extra read-only connection to the cache database.
+
+        In WAL mode readers do not block the writer connection, so other
+        threads can query committed entries while this cache keeps writing.
+        Buffered writes become visible after flush(). The caller closes it.
+
+        Returns:
+            Read-only connection that may be handed to another thread
+
+        Raises:
+            ValueError: If the cache is an in-memory database
+        """
+        if self.hot_path is None:
+            raise ValueError("An in-memory cache cannot be opened by a second connection")
+
+        uri = Path(self.cache_path).resolve().as_uri() + "?mode=ro"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
     def close(self):
-        """Close database connection."""
+        """Commit buffered writes and close database connection."""
         if self.conn:
+            self.flush()
+            self._get_cur.close()
             self.conn.close()
             self.conn = None
 
+            # Written after closing so the snapshot is newer than the database
+            self._write_hot()
+
     def __enter__(self):
         """Context manager entry."""
         return self
@@ -1,20 +1,35 @@
 """
 Location intelligence and geocoding module.
 """
-from typing import Optional, Tuple, Set
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple, Set
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from types import MappingProxyType
 import logging
 import time
 import math
-
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
-import requests
+import re
+import threading
 
 from .cache import GeocodingCache
 
+# geopy and requests are imported on first use to keep CLI startup fast
+if TYPE_CHECKING:
+    import requests
+    from geopy.geocoders import Nominatim
+
 logger = logging.getLogger(__name__)
 
+# Worker threads used for background geocoding
+GEOCODE_WORKERS = 4
+
+# Folder names remembered per cell for the lifetime of a LocationIntelligence
+NAME_MEMO_SIZE = 4096
+
+# Mean Earth radius used for distance calculations
+EARTH_RADIUS_MILES = 3959.0
+
 # Default major US cities
 DEFAULT_MAJOR_CITIES = {
     'New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix',
@@ -32,6 +47,48 @@ DEFAULT_NATIONAL_PARKS = {
     'Death Valley', 'Badlands'
 }
 
+# Lower-cased country names that geocoders use for the United States
+_US_NAMES = frozenset({'united states', 'united states of america', 'usa', 'us'})
+
+# US state name to postal abbreviation
+_STATE_ABBREV = MappingProxyType({
+    'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR',
+    'California': 'CA', 'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE',
+    'Florida': 'FL', 'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID',
+    'Illinois': 'IL', 'Indiana': 'IN', 'Iowa': 'IA', 'Kansas': 'KS',
+    'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME', 'Maryland': 'MD',
+    'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS',
+    'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV',
+    'New Hampshire': 'NH', 'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY',
+    'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH', 'Oklahoma': 'OK',
+    'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
+    'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT',
+    'Vermont': 'VT', 'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV',
+    'Wisconsin': 'WI', 'Wyoming': 'WY', 'District of Columbia': 'DC'
+})
+
+# Characters dropped from folder names (\w is Unicode-aware, matching str.isalnum plus '_')
+_UNSAFE_NAME_CHARS = re.compile(r'[^\w-]')
+
+
+def _compile_name_matcher(names: Iterable[str]) -> Optional[re.Pattern]:
+    """
+    Compile lower-cased names into one alternation regex.
+
+    Longer names are tried first so that overlapping names resolve to the
+    most specific match.
+
+    Args:
+        names: Lower-cased names to match as substrings
+
+    Returns:
+        Compiled pattern, or None if there are no names
+    """
+    names = sorted(set(names), key=len, reverse=True)
+    if not names:
+        return None
+    return re.compile('|'.join(re.escape(name) for name in names))
+
 
 class LocationIntelligence:
     """Geocoding and location intelligence with smart granularity."""
@@ -41,7 +98,8 @@ class LocationIntelligence:
                  locationiq_api_key: Optional[str] = None,
                  major_cities: Set[str] = None,
                  national_parks: Set[str] = None,
-                 clustering_distance_miles: float = 25.0):
+                 clustering_distance_miles: float = 25.0,
+                 geocoder=None):
         """
         Initialize location intelligence.
 
@@ -51,6 +109,8 @@ class LocationIntelligence:
             major_cities: Set of major city names
             national_parks: Set of national park names
             clustering_distance_miles: Distance for location clustering (default 25 miles)
+            geocoder: Geocoder with a geopy-style reverse() method to use in
+                place of Nominatim (optional)
         """
         self.cache = cache or GeocodingCache()
         self.locationiq_api_key = locationiq_api_key
@@ -58,12 +118,98 @@ class LocationIntelligence:
         self.national_parks = national_parks or DEFAULT_NATIONAL_PARKS
         self.clustering_distance_miles = clustering_distance_miles
 
-        # Initialize Nominatim geocoder (fallback, always available)
-        self.nominatim = Nominatim(user_agent="photo-organizer/1.0")
+        # Single-pass matchers for park and city names, built once
+        self._park_names = {park.lower(): park for park in self.national_parks}
+        self._park_re = _compile_name_matcher(self._park_names)
+        self._city_re = _compile_name_matcher(city.lower() for city in self.major_cities)
+
+        # Geocoding clients, created on first use (see nominatim and _http)
+        self._nominatim: Optional["Nominatim"] = geocoder
+        self._http_session: Optional["requests.Session"] = None
+        self._client_lock = threading.Lock()
 
-        # Rate limiting
+        # Rate limiting (shared by all geocoding threads)
         self.last_api_call = 0
         self.min_api_interval = 1.0  # Minimum seconds between API calls
+        self._rate_lock = threading.Lock()
+
+        # Lookups sent to a geocoding service, including background prefetches
+        self.api_calls = 0
+
+        # Background geocoding for prefetch(), keyed by cache cell
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+
+        # Resolved folder names by cell, including "Unknown" for failed lookups
+        # (failures are not written to the persistent cache)
+        self._names: OrderedDict = OrderedDict()
+
+    @property
+    def nominatim(self) -> "Nominatim":
+        """Nominatim geocoder, or the one passed in (fallback, always available)."""
+        if self._nominatim is None:
+            with self._client_lock:
+                if self._nominatim is None:
+                    from geopy.geocoders import Nominatim
+                    self._nominatim = Nominatim(user_agent="photo-organizer/1.0")
+        return self._nominatim
+
+    @property
+    def _http(self) -> "requests.Session":
+        """Keep-alive HTTP session for LocationIQ (reuses TCP/TLS connections)."""
+        if self._http_session is None:
+            with self._client_lock:
+                if self._http_session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    from urllib3.util.retry import Retry
+
+                    session = requests.Session()
+                    session.headers.update({'User-Agent': 'photo-organizer/1.0'})
+                    session.mount('https://', HTTPAdapter(
+                        pool_connections=GEOCODE_WORKERS,
+                        pool_maxsize=2 * GEOCODE_WORKERS,
+                        max_retries=Retry(total=3, backoff_factor=0.5,
+                                          status_forcelist=[429, 502, 503, 504])
+                    ))
+                    self._http_session = session
+        return self._http_session
+
+    def prefetch(self, coords: Iterable[Tuple[float, float]]) -> int:
+        """
+        Start geocoding uncached coordinates in the background.
+
+        Results are picked up by get_location_name(), so network latency
+        overlaps with whatever the caller does in the meantime.
+
+        Args:
+            coords: Iterable of (latitude, longitude) tuples
+
+        Returns:
+            Number of lookups submitted
+        """
+        submitted = 0
+        for lat, lon in coords:
+            key = self.cache.cell_key(lat, lon)
+            with self._pending_lock:
+                if key in self._names or key in self._pending:
+                    continue
+            if self.cache.get_with_neighbors(lat, lon):
+                continue
+
+            with self._pending_lock:
+                if key in self._pending:
+                    continue
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=GEOCODE_WORKERS,
+                                                    thread_name_prefix="geocode")
+                self._pending[key] = self._pool.submit(self._geocode, lat, lon)
+            submitted += 1
+
+        if submitted:
+            logger.debug(f"Prefetching {submitted} locations")
+        return submitted
 
     def get_location_name(self, lat: float, lon: float) -> str:
         """
@@ -76,25 +222,99 @@ class LocationIntelligence:
         Returns:
             Location name formatted for folder structure
         """
-        # Check cache first
-        cached = self.cache.get(lat, lon)
-        if cached:
-            return cached['location_name']
-
-        # Geocode the coordinates
-        location_data = self._geocode(lat, lon)
-
+        key = self.cache.cell_key(lat, lon)
+        with self._pending_lock:
+            if key in self._names:
+                self._names.move_to_end(key)
+                return self._names[key]
+            future = self._pending.get(key)
+
+        if future is None:
+            # Check cache first (including adjacent cells, to absorb GPS jitter)
+            cached = self.cache.get_with_neighbors(lat, lon)
+            if cached:
+                return self._remember_name(key, cached['location_name'])
+
+            # Geocode the coordinates, unless another caller started meanwhile
+            with self._pending_lock:
+                future = self._pending.get(key)
+                if future is None:
+                    future = self._pending[key] = Future()
+                    owner = True
+                else:
+                    owner = False
+
+            if owner:
+                try:
+                    location_data = self._geocode(lat, lon)
+                except Exception as e:
+                    with self._pending_lock:
+                        del self._pending[key]
+                    future.set_exception(e)
+                    raise
+                # Store before resolving, so waiters find the name memoized
+                location_name = self._store_name(key, lat, lon, location_data)
+                with self._pending_lock:
+                    del self._pending[key]
+                future.set_result(location_data)
+                return location_name
+
+        # Wait for the lookup already in flight (a prefetch or another caller).
+        # Whoever removes it from _pending stores the result.
+        try:
+            location_data = future.result()
+        except Exception:
+            with self._pending_lock:
+                if self._pending.get(key) is future:
+                    del self._pending[key]
+            raise
+        with self._pending_lock:
+            if key in self._names:
+                return self._names[key]
+            claimed = self._pending.get(key) is future
+            if claimed:
+                del self._pending[key]
+
+        if claimed:
+            return self._store_name(key, lat, lon, location_data)
         if location_data is None:
-            logger.warning(f"Could not geocode ({lat}, {lon})")
             return "Unknown"
+        return self._apply_granularity_rules(location_data)
 
-        # Apply granularity rules
-        location_name = self._apply_granularity_rules(location_data)
+    def _store_name(self, key: int, lat: float, lon: float,
+                    location_data: Optional[dict]) -> str:
+        """
+        Cache a geocoding result and memoize its folder name.
 
-        # Cache the result
-        location_data['location_name'] = location_name
-        self.cache.set(lat, lon, location_data)
+        Args:
+            key: Cache cell of the coordinates
+            lat: Latitude
+            lon: Longitude
+            location_data: Result of _geocode(), or None if it failed
 
+        Returns:
+            Location name formatted for folder structure
+        """
+        if location_data is None:
+            logger.warning(f"Could not geocode ({lat}, {lon})")
+            location_name = "Unknown"
+        else:
+            # Apply granularity rules
+            location_name = self._apply_granularity_rules(location_data)
+
+            # Cache the result
+            location_data['location_name'] = location_name
+            self.cache.set(lat, lon, location_data)
+
+        return self._remember_name(key, location_name)
+
+    def _remember_name(self, key: int, location_name: str) -> str:
+        """Memoize a resolved folder name, evicting the oldest entry if full."""
+        with self._pending_lock:
+            self._names[key] = location_name
+            self._names.move_to_end(key)
+            if len(self._names) > NAME_MEMO_SIZE:
+                self._names.popitem(last=False)
         return location_name
 
     def _geocode(self, lat: float, lon: float) -> Optional[dict]:
@@ -108,6 +328,9 @@ class LocationIntelligence:
         Returns:
             Dictionary with location components or None
         """
+        with self._rate_lock:
+            self.api_calls += 1
+
         # Try LocationIQ first if API key available
         if self.locationiq_api_key:
             result = self._geocode_locationiq(lat, lon)
@@ -131,7 +354,7 @@ class LocationIntelligence:
                 'zoom': 10  # City level
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self._http.get(url, params=params, timeout=10)
             response.raise_for_status()
 
             data = response.json()
@@ -145,6 +368,8 @@ class LocationIntelligence:
 
     def _geocode_nominatim(self, lat: float, lon: float) -> Optional[dict]:
         """Geocode using Nominatim (OpenStreetMap)."""
+        from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+
         try:
             self._rate_limit()
 
@@ -210,22 +435,27 @@ class LocationIntelligence:
         county = location_data.get('county', '')
 
         # Check if in US
-        is_us = 'United States' in country or 'USA' in country or country == 'US'
+        is_us = country.strip().lower() in _US_NAMES
 
         if not is_us:
             # Foreign country - use country name only
             location_data['granularity'] = 'country'
             return self._normalize_name(country) if country else 'Unknown'
 
+        county_lc = county.lower()
+        city_lc = city.lower()
+
         # US location - check for national parks
-        for park in self.national_parks:
-            if park.lower() in county.lower() or park.lower() in city.lower():
+        if self._park_re:
+            match = self._park_re.search(county_lc) or self._park_re.search(city_lc)
+            if match:
+                park = self._park_names[match.group()]
                 location_data['granularity'] = 'national_park'
                 state_abbr = self._get_state_abbreviation(state)
                 return f"{state_abbr}-{self._normalize_name(park)}"
 
         # Check if major city
-        if city and any(major_city.lower() in city.lower() for major_city in self.major_cities):
+        if city and self._city_re and self._city_re.search(city_lc):
             location_data['granularity'] = 'major_city'
             state_abbr = self._get_state_abbreviation(state)
             return f"{state_abbr}-{self._normalize_name(city)}"
@@ -244,11 +474,8 @@ class LocationIntelligence:
         Returns:
             Normalized name (spaces to underscores, special chars removed)
         """
-        # Replace spaces with underscores
-        name = name.replace(' ', '_')
-        # Remove special characters (keep alphanumeric, underscore, hyphen)
-        name = ''.join(c for c in name if c.isalnum() or c in ('_', '-'))
-        return name
+        # Replace spaces with underscores, then remove special characters
+        return _UNSAFE_NAME_CHARS.sub('', name.replace(' ', '_'))
 
     def _get_state_abbreviation(self, state: str) -> str:
         """
@@ -260,35 +487,18 @@ class LocationIntelligence:
         Returns:
             Two-letter state abbreviation
         """
-        state_abbrev = {
-            'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR',
-            'California': 'CA', 'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE',
-            'Florida': 'FL', 'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID',
-            'Illinois': 'IL', 'Indiana': 'IN', 'Iowa': 'IA', 'Kansas': 'KS',
-            'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME', 'Maryland': 'MD',
-            'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS',
-            'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV',
-            'New Hampshire': 'NH', 'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY',
-            'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH', 'Oklahoma': 'OK',
-            'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
-            'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT',
-            'Vermont': 'VT', 'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV',
-            'Wisconsin': 'WI', 'Wyoming': 'WY', 'District of Columbia': 'DC'
-        }
-
-        # Return abbreviation if found, otherwise return original
-        return state_abbrev.get(state, state)
+        return _STATE_ABBREV.get(state, state)
 
     def _rate_limit(self):
         """Enforce rate limiting for API calls."""
-        now = time.time()
-        time_since_last = now - self.last_api_call
+        # Reserve the next free slot under the lock, then sleep outside it
+        with self._rate_lock:
+            now = time.time()
+            slot = max(now, self.last_api_call + self.min_api_interval)
+            self.last_api_call = slot
 
-        if time_since_last < self.min_api_interval:
-            sleep_time = self.min_api_interval - time_since_last
-            time.sleep(sleep_time)
-
-        self.last_api_call = time.time()
+        if slot > now:
+            time.sleep(slot - now)
 
     def calculate_distance_miles(self, lat1: float, lon1: float,
                                  lat2: float, lon2: float) -> float:
@@ -314,10 +524,7 @@ class LocationIntelligence:
              math.sin(delta_lon / 2) ** 2)
         c = 2 * math.asin(math.sqrt(a))
 
-        # Earth radius in miles
-        radius = 3959.0
-
-        return radius * c
+        return EARTH_RADIUS_MILES * c
 
     def should_cluster_locations(self, lat1: float, lon1: float,
                                 lat2: float, lon2: float) -> bool:
@@ -335,7 +542,16 @@ class LocationIntelligence:
         return distance <= self.clustering_distance_miles
 
     def close(self):
-        """Close cache connection."""
+        """Stop background geocoding and close HTTP session and cache connection."""
+        if self._pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            self._pending.clear()
+
+        if self._http_session is not None:
+            self._http_session.close()
+            self._http_session = None
+
         if self.cache:
             self.cache.close()
 
@@ -3,22 +3,93 @@ Metadata extraction module for photos and videos.
 """
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import Dict, Optional, Sequence, Tuple
 import logging
+import os
+import queue
+import re
 import subprocess
 import json
 import shutil
+import threading
 
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
 from PIL.ExifTags import TAGS, GPSTAGS
 from mutagen.mp4 import MP4
 import pillow_heif
 
+# Prefer orjson for exiftool output when installed; both accept raw UTF-8 bytes
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
 logger = logging.getLogger(__name__)
 
 # Register HEIF opener
 pillow_heif.register_heif_opener()
 
+# Resolved once at import; None if exiftool is not installed
+_EXIFTOOL_PATH = shutil.which('exiftool')
+
+# Seconds to wait for exiftool to answer a single file
+EXIFTOOL_TIMEOUT = 10
+
+# EXIF/exiftool/ISO style dates: "YYYY:MM:DD[ HH:MM:SS]" with ':' or '-' and ' ' or 'T'.
+# Fractional seconds and a zone are accepted (and ignored); anything else is
+# rejected so callers fall through to their next date field.
+_DATE_RE = re.compile(
+    r'(\d{4})[:\-](\d{1,2})[:\-](\d{1,2})'
+    r'(?:[ T](\d{1,2}):(\d{1,2}):(\d{1,2})(?:\.\d+)?(?:Z|[+\-]\d{2}:?\d{2})?)?'
+)
+
+
+def _match_date(date_str: str) -> Optional[datetime]:
+    """
+    Parse a metadata date string (date, optional time).
+
+    Args:
+        date_str: Date string such as "2023:06:15 10:30:00"
+
+    Returns:
+        datetime object, or None if no valid date is found
+    """
+    match = _DATE_RE.fullmatch(date_str.strip())
+    if not match:
+        return None
+    try:
+        return datetime(*(int(field) for field in match.groups(default='0')))
+    except ValueError:
+        # Out-of-range fields, e.g. the "0000:00:00 00:00:00" placeholder
+        return None
+
+
+# Pillow format to try first for each image extension (RAW files are left to sniffing)
+_PILLOW_FORMATS = {
+    '.jpg': ('JPEG',), '.jpeg': ('JPEG',), '.png': ('PNG',), '.heic': ('HEIF',),
+    '.tiff': ('TIFF',), '.bmp': ('BMP',), '.gif': ('GIF',),
+}
+
+# Media extensions grouped by the handler that reads them
+_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.heic', '.tiff', '.bmp', '.gif')
+_RAW_EXTENSIONS = ('.cr2', '.nef', '.arw', '.dng')
+_VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.3gp')
+_OTHER_VIDEO_EXTENSIONS = ('.avi', '.mkv', '.mts', '.m2ts')
+
+# Extensions whose metadata is read with exiftool
+_EXIFTOOL_EXTENSIONS = frozenset(_VIDEO_EXTENSIONS + _OTHER_VIDEO_EXTENSIONS)
+
+# Files sent to exiftool per -execute by extract_batch()
+EXIFTOOL_BATCH_SIZE = 500
+
+# Arguments sent to exiftool for every file (-n for numeric GPS values)
+_EXIFTOOL_ARGS = (
+    '-j', '-G', '-n',
+    '-DateTimeOriginal', '-CreateDate', '-CreationDate', '-MediaCreateDate',
+    '-GPSLatitude', '-GPSLongitude', '-GPSPosition',
+    '-ImageWidth', '-ImageHeight', '-Make', '-Model',
+)
+
 
 class MediaMetadata:
     """Container for media file metadata."""
@@ -37,16 +108,53 @@ class MediaMetadata:
                 f"date={self.date_taken}, gps={self.gps_coords})")
 
 
+def _pump_output(stream, output: queue.Queue):
+    """Copy a pipe into a queue chunk by chunk, ending with b"" at EOF."""
+    try:
+        while True:
+            chunk = stream.read(65536)
+            if not chunk:
+                break
+            output.put(chunk)
+    except (OSError, ValueError):
+        pass
+    finally:
+        output.put(b"")
+
+
 class MetadataExtractor:
     """Extract metadata from photos and videos."""
 
     def __init__(self):
         """Initialize the metadata extractor."""
         # Check if exiftool is available
-        self._exiftool_available = shutil.which('exiftool') is not None
+        self._exiftool_available = _EXIFTOOL_PATH is not None
         if not self._exiftool_available:
             logger.warning("exiftool not found - video GPS extraction may be limited")
 
+        # Persistent "exiftool -stay_open" worker, started on first use
+        self._et_proc: Optional[subprocess.Popen] = None
+        self._et_lock = threading.Lock()
+        self._et_seq = 0
+
+        # Output chunks from the worker, pumped by a reader thread (b"" at EOF).
+        # Pipes cannot be select()ed on Windows, so a thread gives the timeout.
+        self._et_output: Optional[queue.Queue] = None
+        self._et_reader: Optional[threading.Thread] = None
+
+        # exiftool output fetched ahead of time by extract_batch(), keyed by path
+        self._batch_data: Dict[str, dict] = {}
+
+        # Extension -> extraction handler, looked up once per file
+        self._dispatch = {}
+        for extensions, handler in (
+            (_IMAGE_EXTENSIONS, self._extract_image_metadata),
+            (_RAW_EXTENSIONS, self._extract_raw_metadata),
+            (_VIDEO_EXTENSIONS, self._extract_video_metadata),
+            (_OTHER_VIDEO_EXTENSIONS, self._extract_video_metadata_fallback),
+        ):
+            self._dispatch.update(dict.fromkeys(extensions, handler))
+
     def extract(self, file_path: Path) -> MediaMetadata:
         """
         Extract metadata from a media file.
@@ -62,18 +170,9 @@ class MetadataExtractor:
         ext = file_path.suffix.lower()
 
         try:
-            # Images
-            if ext in {'.jpg', '.jpeg', '.png', '.heic', '.tiff', '.bmp', '.gif'}:
-                self._extract_image_metadata(file_path, metadata)
-            # RAW formats
-            elif ext in {'.cr2', '.nef', '.arw', '.dng'}:
-                self._extract_raw_metadata(file_path, metadata)
-            # Videos
-            elif ext in {'.mp4', '.mov', '.m4v', '.3gp'}:
-                self._extract_video_metadata(file_path, metadata)
-            # Other video formats
-            elif ext in {'.avi', '.mkv', '.mts', '.m2ts'}:
-                self._extract_video_metadata_fallback(file_path, metadata)
+            handler = self._dispatch.get(ext)
+            if handler is not None:
+                handler(file_path, metadata)
 
             # Fallback to file system date if no metadata found
             if metadata.date_taken is None:
@@ -86,10 +185,70 @@ class MetadataExtractor:
 
         return metadata
 
+    def extract_batch(self, file_paths: Sequence[Path]) -> Dict[Path, MediaMetadata]:
+        """
+        Extract metadata from many files, sharing exiftool calls between them.
+
+        Files that need exiftool are sent EXIFTOOL_BATCH_SIZE at a time in a
+        single -execute, instead of one request per file.
+
+        Args:
+            file_paths: Paths to media files
+
+        Returns:
+            Dictionary mapping each path to its metadata (paths that could not
+            be read at all are left out)
+        """
+        results: Dict[Path, MediaMetadata] = {}
+
+        for start in range(0, len(file_paths), EXIFTOOL_BATCH_SIZE):
+            chunk = file_paths[start:start + EXIFTOOL_BATCH_SIZE]
+
+            if self._exiftool_available:
+                self._prefetch_exiftool(
+                    [path for path in chunk if path.suffix.lower() in _EXIFTOOL_EXTENSIONS]
+                )
+
+            try:
+                for file_path in chunk:
+                    try:
+                        results[file_path] = self.extract(file_path)
+                    except Exception as e:
+                        logger.debug(f"Error extracting metadata from {file_path}: {e}")
+            finally:
+                self._batch_data.clear()
+
+        return results
+
+    def _prefetch_exiftool(self, file_paths: Sequence[Path]):
+        """
+        Query exiftool for several files at once and keep the results for extract().
+
+        Files missing from the reply are queried individually later.
+
+        Args:
+            file_paths: Paths to media files
+        """
+        if not file_paths:
+            return
+
+        try:
+            output = self._query_exiftool(file_paths)
+            entries = _json_loads(output) if output.strip() else []
+        except (subprocess.TimeoutExpired, ValueError, RuntimeError, OSError) as e:
+            logger.debug(f"Batched exiftool query failed for {len(file_paths)} files: {e}")
+            return
+
+        for data in entries:
+            source = data.get('SourceFile')
+            if source:
+                self._batch_data[source] = data
+
     def _extract_image_metadata(self, file_path: Path, metadata: MediaMetadata):
         """Extract metadata from image files using Pillow."""
         try:
-            with Image.open(file_path) as img:
+            # Image.open only parses the header; size and EXIF never decode pixels
+            with self._open_image(file_path) as img:
                 # Get image dimensions
                 metadata.width, metadata.height = img.size
 
@@ -113,6 +272,27 @@ class MetadataExtractor:
         except Exception as e:
             logger.debug(f"Error reading image EXIF from {file_path.name}: {e}")
 
+    def _open_image(self, file_path: Path) -> Image.Image:
+        """
+        Open an image, trying the format implied by its extension first.
+
+        Pillow otherwise probes every registered plugin in turn. Files whose
+        content does not match their extension fall back to full sniffing.
+
+        Args:
+            file_path: Path to image file
+
+        Returns:
+            Lazily loaded Pillow image
+        """
+        formats = _PILLOW_FORMATS.get(file_path.suffix.lower())
+        if formats:
+            try:
+                return Image.open(file_path, formats=formats)
+            except UnidentifiedImageError:
+                logger.debug(f"{file_path.name} is not {formats[0]}, detecting format")
+        return Image.open(file_path)
+
     def _extract_raw_metadata(self, file_path: Path, metadata: MediaMetadata):
         """Extract metadata from RAW image files."""
         # For RAW files, we'll try to use Pillow which can handle some RAW formats
@@ -134,23 +314,15 @@ class MetadataExtractor:
             return
 
         try:
-            # Run exiftool with JSON output for easy parsing
-            result = subprocess.run(
-                ['exiftool', '-j', '-G', '-n',  # -n for numeric GPS values
-                 '-DateTimeOriginal', '-CreateDate', '-CreationDate', '-MediaCreateDate',
-                 '-GPSLatitude', '-GPSLongitude', '-GPSPosition',
-                 '-ImageWidth', '-ImageHeight', '-Make', '-Model',
-                 str(file_path)],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-
-            if result.returncode != 0:
-                logger.debug(f"exiftool failed for {file_path.name}: {result.stderr}")
-                return
-
-            data = json.loads(result.stdout)[0]
+            data = self._batch_data.pop(os.fspath(file_path), None)
+            if data is None:
+                # Query the persistent exiftool worker with JSON output for easy parsing
+                output = self._query_exiftool([file_path])
+                if not output.strip():
+                    logger.debug(f"exiftool returned no metadata for {file_path.name}")
+                    return
+
+                data = _json_loads(output)[0]
 
             # Extract date/time (try multiple fields)
             date_fields = [
@@ -211,6 +383,101 @@ class MetadataExtractor:
         except Exception as e:
             logger.debug(f"Error using exiftool on {file_path.name}: {e}")
 
+    def _query_exiftool(self, file_paths: Sequence[Path]) -> bytes:
+        """
+        Send files to the stay-open exiftool worker and return its JSON output.
+
+        Arguments are written to exiftool's stdin argfile, terminated by a
+        numbered -execute, and the reply is read up to the matching {ready}.
+
+        Args:
+            file_paths: Paths to media files (answered as one JSON array)
+
+        Returns:
+            Raw JSON printed by exiftool, as UTF-8 bytes (empty if it had nothing to report)
+        """
+        with self._et_lock:
+            if self._et_proc is None or self._et_proc.poll() is not None:
+                self._start_exiftool()
+
+            self._et_seq += 1
+            ready = f"{{ready{self._et_seq}}}".encode()
+            args = [*_EXIFTOOL_ARGS, *map(os.fspath, file_paths), f"-execute{self._et_seq}", ""]
+
+            proc = self._et_proc
+            proc.stdin.write("\n".join(args).encode('utf-8'))
+            proc.stdin.flush()
+
+            # Read until the sentinel line, giving up if exiftool stalls
+            output = bytearray()
+            while not output[-len(ready) - 8:].rstrip().endswith(ready):
+                try:
+                    chunk = self._et_output.get(timeout=EXIFTOOL_TIMEOUT)
+                except queue.Empty:
+                    self._stop_exiftool(force=True)
+                    raise subprocess.TimeoutExpired(proc.args, EXIFTOOL_TIMEOUT)
+                if not chunk:
+                    self._stop_exiftool(force=True)
+                    raise RuntimeError("exiftool exited unexpectedly")
+                output += chunk
+
+            return bytes(output).rstrip()[:-len(ready)]
+
+    def _start_exiftool(self):
+        """Start the stay-open exiftool worker and the thread reading its output."""
+        self._et_proc = subprocess.Popen(
+            [_EXIFTOOL_PATH, '-stay_open', 'True', '-@', '-'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0
+        )
+        self._et_output = queue.Queue()
+        self._et_reader = threading.Thread(
+            target=_pump_output,
+            args=(self._et_proc.stdout, self._et_output),
+            name="exiftool-reader",
+            daemon=True
+        )
+        self._et_reader.start()
+
+    def _stop_exiftool(self, force: bool = False):
+        """Shut down the stay-open exiftool worker."""
+        proc, self._et_proc = self._et_proc, None
+        reader, self._et_reader = self._et_reader, None
+        self._et_output = None
+        if proc is None:
+            return
+
+        try:
+            if not force and proc.poll() is None:
+                proc.stdin.write(b"-stay_open\nFalse\n")
+                proc.stdin.flush()
+                proc.wait(timeout=EXIFTOOL_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            # The reader sees EOF once the process is gone
+            if reader is not None:
+                reader.join(timeout=EXIFTOOL_TIMEOUT)
+            proc.stdin.close()
+            proc.stdout.close()
+
+    def close(self):
+        """Stop the exiftool worker (restarted automatically if needed again)."""
+        with self._et_lock:
+            self._stop_exiftool()
+
+    def __del__(self):
+        """Make sure the exiftool worker does not outlive the extractor."""
+        try:
+            self._stop_exiftool()
+        except Exception:
+            pass
+
     def _parse_exiftool_date(self, date_value: str) -> Optional[datetime]:
         """
         Parse date string from exiftool output.
@@ -224,27 +491,11 @@ class MetadataExtractor:
         if not date_value or not isinstance(date_value, str):
             return None
 
-        # Clean up the date string
-        date_str = date_value.strip()
-
-        # Try various date formats
-        formats = [
-            "%Y:%m:%d %H:%M:%S",      # EXIF format
-            "%Y-%m-%d %H:%M:%S",      # ISO-like format
-            "%Y:%m:%d",               # Date only
-            "%Y-%m-%d",               # ISO date only
-            "%Y-%m-%dT%H:%M:%S",      # ISO format
-            "%Y-%m-%dT%H:%M:%SZ",     # ISO with Z
-        ]
-
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str.split('.')[0], fmt)  # Remove microseconds
-            except ValueError:
-                continue
-
-        logger.debug(f"Could not parse date: {date_value}")
-        return None
+        # EXIF or ISO format, with or without time (trailing fraction/zone ignored)
+        parsed = _match_date(date_value.strip())
+        if parsed is None:
+            logger.debug(f"Could not parse date: {date_value}")
+        return parsed
 
     def _extract_video_metadata(self, file_path: Path, metadata: MediaMetadata):
         """
@@ -260,7 +511,7 @@ class MetadataExtractor:
         # If we still don't have all metadata, try mutagen as fallback
         if metadata.date_taken is None or metadata.width is None:
             try:
-                video = MP4(str(file_path))
+                video = MP4(file_path)
 
                 # Extract creation date if not already found
                 if metadata.date_taken is None:
@@ -298,16 +549,11 @@ class MetadataExtractor:
 
     def _parse_exif_date(self, date_str: str) -> Optional[datetime]:
         """Parse EXIF date string to datetime."""
-        try:
-            # EXIF format: "YYYY:MM:DD HH:MM:SS"
-            return datetime.strptime(date_str, "%Y:%m:%d %H:%M:%S")
-        except ValueError:
-            try:
-                # Try without time
-                return datetime.strptime(date_str, "%Y:%m:%d")
-            except ValueError:
-                logger.debug(f"Could not parse EXIF date: {date_str}")
-                return None
+        # EXIF format: "YYYY:MM:DD HH:MM:SS" (time optional)
+        parsed = _match_date(date_str)
+        if parsed is None:
+            logger.debug(f"Could not parse EXIF date: {date_str}")
+        return parsed
 
     def _parse_video_date(self, date_str: str) -> Optional[datetime]:
         """Parse video metadata date string to datetime."""
@@ -319,8 +565,11 @@ class MetadataExtractor:
                 return datetime.fromisoformat(date_str)
             else:
                 # Simple date format
-                return datetime.strptime(date_str, "%Y-%m-%d")
-        except (ValueError, AttributeError) as e:
+                parsed = _match_date(date_str)
+                if parsed is None:
+                    raise ValueError("unrecognized date format")
+                return parsed
+        except (ValueError, AttributeError, TypeError) as e:
             logger.debug(f"Could not parse video date: {date_str} - {e}")
             return None
 
@@ -403,6 +652,10 @@ class MetadataExtractor:
         return datetime.fromtimestamp(timestamp)
 
 
+# Shared by extract_metadata() so repeated calls reuse one exiftool worker
+_DEFAULT_EXTRACTOR: Optional[MetadataExtractor] = None
+
+
 def extract_metadata(file_path: Path) -> MediaMetadata:
     """
     Convenience function to extract metadata from a file.
@@ -413,5 +666,7 @@ def extract_metadata(file_path: Path) -> MediaMetadata:
     Returns:
         MediaMetadata object
     """
-    extractor = MetadataExtractor()
-    return extractor.extract(file_path)
+    global _DEFAULT_EXTRACTOR
+    if _DEFAULT_EXTRACTOR is None:
+        _DEFAULT_EXTRACTOR = MetadataExtractor()
+    return _DEFAULT_EXTRACTOR.extract(file_path)
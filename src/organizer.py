@@ -2,19 +2,70 @@
 File organizer with dry-run support and safety features.
 """
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import multiprocessing.util
+import os
 import shutil
 import logging
 from tqdm import tqdm
 
 from .scanner import MediaScanner
-from .metadata import MetadataExtractor
+from .metadata import MetadataExtractor, MediaMetadata, EXIFTOOL_BATCH_SIZE
 from .location import LocationIntelligence
 from .path_generator import PathGenerator
-from .utils import Statistics, TransactionLog, verify_file_integrity
+from .utils import Statistics, TransactionLog, clone_file, copy_file_with_hash, verify_file_integrity
 
 logger = logging.getLogger(__name__)
 
+# Worker processes used to read metadata for large batches
+METADATA_WORKERS = os.cpu_count() or 1
+
+# Below this many files, process start-up costs more than it saves
+PARALLEL_METADATA_MIN_FILES = 64
+
+# Files read per pipeline step when metadata is read in-process
+METADATA_CHUNK_SIZE = 128
+
+# Minimum seconds between progress bar redraws
+PROGRESS_INTERVAL = 0.2
+
+# Per-process extractor, created by _init_metadata_worker()
+_worker_extractor: Optional[MetadataExtractor] = None
+
+
+def _init_metadata_worker():
+    """Create the metadata extractor for a worker process."""
+    global _worker_extractor
+    _worker_extractor = MetadataExtractor()
+
+    # Workers exit without running __del__, so stop exiftool explicitly
+    multiprocessing.util.Finalize(_worker_extractor, _worker_extractor.close, exitpriority=10)
+
+
+def _index_key(path: str) -> str:
+    """
+    Key a destination path for duplicate checks.
+
+    Case is folded even where the filesystem is case-sensitive, so
+    IMG_0001.JPG and img_0001.jpg collide on APFS and NTFS defaults.
+
+    Args:
+        path: File path
+
+    Returns:
+        Normalized, case-folded path
+    """
+    return os.path.normcase(path).casefold()
+
+
+def _extract_batch_in_worker(file_paths: List[Path]) -> List[Optional[MediaMetadata]]:
+    """Extract metadata for a chunk of files in a worker process (None where it failed)."""
+    results = _worker_extractor.extract_batch(file_paths)
+    return [results.get(file_path) for file_path in file_paths]
+
 
 class PhotoOrganizer:
     """Main organizer for photo and video files."""
@@ -59,8 +110,14 @@ class PhotoOrganizer:
         self.stats = Statistics()
         self.duplicates: List[Dict] = []
 
+        # Device of the destination root, for same-filesystem moves (set in organize)
+        self._dest_dev: Optional[int] = None
+
+        # Keys of files already in the destination, for duplicate checks (set in organize)
+        self._existing: Set[str] = set()
+
         # Transaction log
-        log_file = self.destination_path / "transaction_log.json"
+        log_file = self.destination_path / "transaction_log.jsonl"
         self.transaction_log = TransactionLog(log_file)
 
     def organize(self) -> Statistics:
@@ -81,6 +138,10 @@ class PhotoOrganizer:
         if not self.destination_path.exists() and not self.dry_run:
             self.destination_path.mkdir(parents=True, exist_ok=True)
 
+        if self.destination_path.exists():
+            self._dest_dev = os.stat(self.destination_path).st_dev
+        self._existing = self._index_destination()
+
         # Scan for files
         logger.info("Scanning for media files...")
         media_files = self.scanner.scan(self.source_path)
@@ -91,16 +152,33 @@ class PhotoOrganizer:
             return self.stats
 
         logger.info(f"Found {len(media_files)} media files")
+        api_calls_before = self.location_intelligence.api_calls
 
-        # Process each file
-        with tqdm(media_files, desc="Organizing files", unit="file") as pbar:
-            for file_path in pbar:
-                pbar.set_description(f"Processing {file_path.name}")
-                self._process_file(file_path)
-
-        # Save transaction log
-        if not self.dry_run:
-            self.transaction_log.save()
+        # Metadata for later chunks is read in the background while files are
+        # placed, and each chunk's locations are geocoded as soon as it arrives
+        try:
+            # The bar redraws at most every PROGRESS_INTERVAL seconds; the current
+            # file is shown once per chunk rather than formatted for every file
+            with tqdm(total=len(media_files), desc="Organizing files", unit="file",
+                      mininterval=PROGRESS_INTERVAL) as pbar:
+                for chunk, metadata_list in self._iter_metadata(media_files):
+                    self._prefetch_locations(metadata_list)
+                    pbar.set_postfix_str(chunk[0].name, refresh=False)
+                    for file_path, metadata in zip(chunk, metadata_list):
+                        self._process_file(file_path, metadata)
+                        pbar.update()
+        finally:
+            # Files already moved must stay undoable even if the run aborts
+            self.metadata_extractor.close()
+            self.location_intelligence.cache.flush()
+
+            # Lookups are counted where they are sent, since most run in
+            # prefetch threads rather than for the file that needed them
+            self.stats.record_api_call(self.location_intelligence.api_calls - api_calls_before)
+
+            # Save transaction log
+            if not self.dry_run:
+                self.transaction_log.save()
 
         # Save duplicates report
         if self.duplicates:
@@ -108,16 +186,139 @@ class PhotoOrganizer:
 
         return self.stats
 
-    def _process_file(self, file_path: Path):
+    def _index_destination(self) -> Set[str]:
+        """
+        List every file already in the destination with a single walk.
+
+        One directory traversal replaces a stat() per processed file, which
+        matters most on network filesystems.
+
+        Returns:
+            Set of _index_key() file path keys (empty if the destination does not exist)
+        """
+        existing = set()
+        for root, _, files in os.walk(self.destination_path):
+            existing.update(_index_key(os.path.join(root, name)) for name in files)
+        logger.debug(f"Indexed {len(existing)} existing destination files")
+        return existing
+
+    def _extract_all(self, media_files: List[Path]) -> List[Optional[MediaMetadata]]:
+        """
+        Extract metadata for every file.
+
+        Args:
+            media_files: Files to read
+
+        Returns:
+            Metadata per file, in the same order (None where extraction failed)
+        """
+        metadata_list: List[Optional[MediaMetadata]] = []
+        for _, results in self._iter_metadata(media_files):
+            metadata_list.extend(results)
+        return metadata_list
+
+    def _iter_metadata(self, media_files: List[Path]
+                       ) -> Iterator[Tuple[List[Path], List[Optional[MediaMetadata]]]]:
+        """
+        Read metadata chunk by chunk, staying ahead of the consumer.
+
+        Large batches are spread over worker processes. Otherwise a single
+        background thread reads the next chunk while the caller handles the
+        current one. File operations stay on the caller's thread, so
+        transaction log order is unaffected.
+
+        Args:
+            media_files: Files to read
+
+        Yields:
+            Tuples of (chunk of files, metadata per file in the same order,
+            None where extraction failed)
+        """
+        if len(media_files) < PARALLEL_METADATA_MIN_FILES or METADATA_WORKERS < 2:
+            chunks = [media_files[start:start + METADATA_CHUNK_SIZE]
+                      for start in range(0, len(media_files), METADATA_CHUNK_SIZE)]
+
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="metadata") as executor:
+                pending = executor.submit(self._extract_chunk, chunks[0]) if chunks else None
+                for index, chunk in enumerate(chunks):
+                    results = pending.result()
+                    if index + 1 < len(chunks):
+                        pending = executor.submit(self._extract_chunk, chunks[index + 1])
+                    yield chunk, results
+            return
+
+        # Several chunks per worker keep them evenly loaded
+        chunk_size = max(1, min(EXIFTOOL_BATCH_SIZE,
+                                -(-len(media_files) // (METADATA_WORKERS * 4))))
+        chunks = [media_files[start:start + chunk_size]
+                  for start in range(0, len(media_files), chunk_size)]
+
+        # Avoid fork(): geocoding and progress-bar threads may already be running
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+        with ProcessPoolExecutor(max_workers=METADATA_WORKERS, mp_context=context,
+                                 initializer=_init_metadata_worker) as executor:
+            results = executor.map(_extract_batch_in_worker, chunks)
+            try:
+                for index, chunk in enumerate(chunks):
+                    try:
+                        chunk_results = next(results)
+                    except BrokenProcessPool as e:
+                        # A worker died (killed, or crashed in a decoder)
+                        logger.warning(f"Metadata worker pool failed ({e}), "
+                                       f"reading remaining files in-process")
+                        break
+                    yield chunk, chunk_results
+                else:
+                    return
+            finally:
+                # map() submits every chunk up front; if the consumer stops
+                # early, drop the queued ones instead of extracting them all
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        for chunk in chunks[index:]:
+            yield chunk, self._extract_chunk(chunk)
+
+    def _extract_chunk(self, file_paths: List[Path]) -> List[Optional[MediaMetadata]]:
+        """Extract metadata for a chunk of files (None where extraction failed)."""
+        results = self.metadata_extractor.extract_batch(file_paths)
+        return [results.get(file_path) for file_path in file_paths]
+
+    def _prefetch_locations(self, metadata_list: List[Optional[MediaMetadata]]):
+        """
+        Warm the geocoding cache for the batch and geocode the rest in the background.
+
+        Args:
+            metadata_list: Extracted metadata (None entries are skipped)
+        """
+        coords = [
+            metadata.gps_coords for metadata in metadata_list
+            if metadata is not None and metadata.gps_coords is not None
+        ]
+        if not coords:
+            return
+
+        # One batched query resolves every cell that is already cached
+        cache = self.location_intelligence.cache
+        cached = cache.get_many(cache.cell_key(lat, lon) for lat, lon in coords)
+        self.location_intelligence.prefetch(
+            (lat, lon) for lat, lon in coords
+            if cache.cell_key(lat, lon) not in cached
+        )
+
+    def _process_file(self, file_path: Path, metadata: Optional[MediaMetadata] = None):
         """
         Process a single media file.
 
         Args:
             file_path: Path to the media file
+            metadata: Previously extracted metadata (extracted here if None)
         """
         try:
             # Extract metadata
-            metadata = self.metadata_extractor.extract(file_path)
+            if metadata is None:
+                metadata = self.metadata_extractor.extract(file_path)
 
             # Update statistics
             has_date = metadata.date_taken is not None
@@ -132,27 +333,29 @@ class PhotoOrganizer:
                 lat, lon = metadata.gps_coords
 
                 # Check cache first
-                cached = self.location_intelligence.cache.get(lat, lon)
+                cached = self.location_intelligence.cache.get_with_neighbors(lat, lon)
                 if cached:
                     location_name = cached['location_name']
                     self.stats.record_cache_hit()
                 else:
                     location_name = self.location_intelligence.get_location_name(lat, lon)
-                    self.stats.record_api_call()
 
                 self.stats.record_location(location_name)
 
             # Generate target path
             target_path = self.path_generator.generate_path(metadata, location_name)
 
-            # Check for duplicates
-            if target_path.exists():
-                target_path = self.path_generator.ensure_unique_path(target_path, metadata)
-                self.stats.record_duplicate()
-                self.duplicates.append({
-                    'original': str(file_path),
-                    'target': str(target_path)
-                })
+            # Check for duplicates; the index ignores case, so a hit on a
+            # case-sensitive filesystem is confirmed by ensure_unique_path
+            if _index_key(str(target_path)) in self._existing:
+                unique_path = self.path_generator.ensure_unique_path(target_path, metadata)
+                if unique_path != target_path:
+                    target_path = unique_path
+                    self.stats.record_duplicate()
+                    self.duplicates.append({
+                        'original': str(file_path),
+                        'target': str(target_path)
+                    })
 
             # Create directory
             target_dir = target_path.parent
@@ -168,6 +371,7 @@ class PhotoOrganizer:
             else:
                 success = self._perform_file_operation(file_path, target_path)
                 if success:
+                    self._existing.add(_index_key(str(target_path)))
                     self.stats.record_processed()
                 else:
                     self.stats.record_failed(f"Failed to {self.mode} {file_path.name}")
@@ -189,15 +393,23 @@ class PhotoOrganizer:
         """
         try:
             if self.mode == 'move':
-                shutil.move(str(source), str(destination))
+                self._move_file(source, destination)
                 logger.debug(f"Moved: {source.name} -> {destination}")
             elif self.mode == 'copy':
-                shutil.copy2(str(source), str(destination))
-                logger.debug(f"Copied: {source.name} -> {destination}")
+                # A copy-on-write clone shares the source's blocks, so there
+                # is nothing to verify
+                cloned = clone_file(source, destination)
+                if not cloned:
+                    if self.verify:
+                        # Hash the source during the copy so it is only read once
+                        source_digest = copy_file_with_hash(source, destination)
+                    else:
+                        shutil.copy2(source, destination)
+                logger.debug(f"{'Cloned' if cloned else 'Copied'}: {source.name} -> {destination}")
 
                 # Verify integrity if requested
-                if self.verify:
-                    if not verify_file_integrity(source, destination):
+                if self.verify and not cloned:
+                    if not verify_file_integrity(source, destination, source_digest):
                         logger.error(f"Integrity verification failed: {destination}")
                         destination.unlink()  # Remove corrupted copy
                         self.transaction_log.log_operation(
@@ -216,6 +428,24 @@ class PhotoOrganizer:
             self.transaction_log.log_operation(self.mode, source, destination, False, str(e))
             return False
 
+    def _move_file(self, source: Path, destination: Path):
+        """
+        Move a file, using a plain rename when it stays on the same filesystem.
+
+        Args:
+            source: Source file path
+            destination: Destination file path
+        """
+        if self._dest_dev is not None and os.stat(source).st_dev == self._dest_dev:
+            try:
+                os.rename(source, destination)
+                return
+            except OSError as e:
+                # e.g. a different mount below the destination root
+                logger.debug(f"Rename failed, falling back to shutil.move: {e}")
+
+        shutil.move(source, destination)
+
     def _save_duplicates_report(self):
         """Save report of duplicate files."""
         report_path = self.destination_path / "duplicates_report.txt"
@@ -247,31 +477,40 @@ class PhotoOrganizer:
         """
         logger.info(f"Generating preview (limit={limit})")
 
-        media_files = self.scanner.scan(self.source_path)
+        media_files = self.scanner.scan(self.source_path)[:limit]
         preview_items = []
 
-        for file_path in media_files[:limit]:
-            try:
-                metadata = self.metadata_extractor.extract(file_path)
-
-                location_name = None
-                if metadata.gps_coords:
-                    lat, lon = metadata.gps_coords
-                    location_name = self.location_intelligence.get_location_name(lat, lon)
-
-                target_path = self.path_generator.generate_path(metadata, location_name)
-                relative_target = self.path_generator.get_relative_path(target_path)
-
-                preview_items.append({
-                    'source': str(file_path),
-                    'target': str(relative_target),
-                    'has_gps': metadata.gps_coords is not None,
-                    'has_date': metadata.date_taken is not None,
-                    'location': location_name or "Unknown"
-                })
-
-            except Exception as e:
-                logger.error(f"Error previewing {file_path}: {e}")
+        try:
+            metadata_list = self._extract_all(media_files)
+            self._prefetch_locations(metadata_list)
+
+            for file_path, metadata in zip(media_files, metadata_list):
+                try:
+                    if metadata is None:
+                        metadata = self.metadata_extractor.extract(file_path)
+
+                    location_name = None
+                    if metadata.gps_coords:
+                        lat, lon = metadata.gps_coords
+                        location_name = self.location_intelligence.get_location_name(lat, lon)
+
+                    target_path = self.path_generator.generate_path(metadata, location_name)
+                    relative_target = self.path_generator.get_relative_path(target_path)
+
+                    preview_items.append({
+                        'source': str(file_path),
+                        'target': str(relative_target),
+                        'has_gps': metadata.gps_coords is not None,
+                        'has_date': metadata.date_taken is not None,
+                        'location': location_name or "Unknown"
+                    })
+
+                except Exception as e:
+                    logger.error(f"Error previewing {file_path}: {e}")
+        finally:
+            # Locations geocoded for the preview are kept for the real run
+            self.metadata_extractor.close()
+            self.location_intelligence.cache.flush()
 
         return preview_items
 
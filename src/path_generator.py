@@ -3,13 +3,35 @@ Path generator for organizing media files.
 """
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+import os
+import string
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set, Tuple
 import logging
 
 from .metadata import MediaMetadata
 
 logger = logging.getLogger(__name__)
 
+# Highest counter tried when making a colliding filename unique
+MAX_UNIQUE_COUNTER = 1000
+
+
+@lru_cache(maxsize=4096)
+def _date_parts(year: int, month: int, day: int) -> Tuple[str, str, str, str]:
+    """
+    Format a calendar day, shared by every file taken on that day.
+
+    Args:
+        year: Year
+        month: Month
+        day: Day of month
+
+    Returns:
+        Tuple of (year, month, day, "YYYY-MM-DD") strings
+    """
+    return f"{year:04d}", f"{month:02d}", f"{day:02d}", f"{year:04d}-{month:02d}-{day:02d}"
+
 
 class PathGenerator:
     """Generate organized directory structure and file paths."""
@@ -25,7 +47,27 @@ class PathGenerator:
                             {original_name}, {ext}, {counter}
         """
         self.destination_root = Path(destination_root)
+        # Target paths are built under destination_root, so their string form
+        # starts with this prefix; checked before falling back to relative_to
+        self._root_prefix = os.path.join(str(self.destination_root), "")
         self.filename_pattern = filename_pattern
+        self._uses_counter = "{counter}" in filename_pattern
+
+        # Pattern split once into (literal, placeholder) pairs; None if it uses
+        # format features beyond plain {name} fields
+        self._segments = self._parse_pattern(filename_pattern)
+
+        # Directories known to exist (or, in a dry run, known to be planned);
+        # most files land in a directory an earlier file already needed
+        self._created_dirs: Set[Path] = set()
+
+        # Last counter handed out per colliding path; collisions cluster, so
+        # the next probe for the same name starts there
+        self._last_counter: Dict[Path, int] = {}
+
+        # File names per target directory, listed once when a collision
+        # first happens there and kept up to date with names handed out
+        self._dir_names: Dict[Path, Set[str]] = {}
 
     def generate_path(self,
                      metadata: MediaMetadata,
@@ -43,14 +85,13 @@ class PathGenerator:
             Complete target path for the file
         """
         # Get date components
+        date_fields = self._date_fields(metadata.date_taken)
         if metadata.date_taken:
             year = str(metadata.date_taken.year)
-            month = f"{metadata.date_taken.month:02d}"
-            date_prefix = metadata.date_taken.strftime("%Y-%m-%d")
+            month = date_fields[1]
         else:
             year = "Unknown_Date"
             month = ""
-            date_prefix = "Unknown"
 
         # Get location
         location = location_name or "Unknown"
@@ -63,38 +104,44 @@ class PathGenerator:
             dir_path = self.destination_root / year / month / location
 
         # Build filename
-        filename = self._generate_filename(metadata, date_prefix)
+        filename = self._generate_filename(metadata, date_fields)
 
         return dir_path / filename
 
-    def _generate_filename(self, metadata: MediaMetadata, date_prefix: str) -> str:
+    @staticmethod
+    def _date_fields(date_taken: Optional[datetime]) -> Tuple[str, str, str, str]:
+        """
+        Format the date placeholders for a file.
+
+        Args:
+            date_taken: Capture date, or None if unknown
+
+        Returns:
+            Tuple of (year, month, day, date), each "Unknown" if there is no date
+        """
+        if not date_taken:
+            return ("Unknown",) * 4
+
+        return _date_parts(date_taken.year, date_taken.month, date_taken.day)
+
+    def _generate_filename(self, metadata: MediaMetadata,
+                           date_fields: Tuple[str, str, str, str]) -> str:
         """
         Generate filename using the configured pattern.
 
         Args:
             metadata: MediaMetadata object
-            date_prefix: Date prefix (e.g., "2023-06-15" or "Unknown")
+            date_fields: (year, month, day, date) from _date_fields()
 
         Returns:
             Generated filename
         """
         original_name = metadata.file_path.stem
         extension = metadata.file_path.suffix
-
-        # Extract date components
-        if metadata.date_taken:
-            year = f"{metadata.date_taken.year:04d}"
-            month = f"{metadata.date_taken.month:02d}"
-            day = f"{metadata.date_taken.day:02d}"
-            date = date_prefix
-        else:
-            year = "Unknown"
-            month = "Unknown"
-            day = "Unknown"
-            date = "Unknown"
+        year, month, day, date = date_fields
 
         # Build the filename from pattern
-        filename = self.filename_pattern.format(
+        return self._render(
             date=date,
             year=year,
             month=month,
@@ -104,7 +151,44 @@ class PathGenerator:
             counter=""  # Counter is handled separately in ensure_unique_path
         )
 
-        return filename
+    @staticmethod
+    def _parse_pattern(pattern: str) -> Optional[List[Tuple[str, Optional[str]]]]:
+        """
+        Split a filename pattern into literal text and placeholder names.
+
+        Args:
+            pattern: Filename pattern
+
+        Returns:
+            List of (literal, placeholder or None) pairs, or None if the pattern
+            uses conversions, format specs or non-identifier fields
+        """
+        try:
+            parsed = list(string.Formatter().parse(pattern))
+        except ValueError:
+            return None
+
+        segments = []
+        for literal, field, format_spec, conversion in parsed:
+            if field is not None and (not field.isidentifier() or format_spec or conversion):
+                return None
+            segments.append((literal, field))
+        return segments
+
+    def _render(self, **values: str) -> str:
+        """
+        Fill the filename pattern, equivalent to filename_pattern.format(**values).
+
+        Args:
+            values: Placeholder values
+
+        Returns:
+            Rendered filename
+        """
+        if self._segments is None:
+            return self.filename_pattern.format(**values)
+        return "".join(literal + values[field] if field else literal
+                       for literal, field in self._segments)
 
     def ensure_unique_path(self, target_path: Path, metadata: MediaMetadata = None) -> Path:
         """
@@ -122,26 +206,15 @@ class PathGenerator:
         if not target_path.exists():
             return target_path
 
-        # Check if pattern uses {counter} placeholder
-        uses_counter_placeholder = "{counter}" in self.filename_pattern
-
-        if uses_counter_placeholder and metadata:
+        if self._uses_counter and metadata:
             # Regenerate filename with counter in the pattern
             original_name = metadata.file_path.stem
             extension = metadata.file_path.suffix
             base_dir = target_path.parent
+            year, month, day, date = self._date_fields(metadata.date_taken)
 
-            if metadata.date_taken:
-                year = f"{metadata.date_taken.year:04d}"
-                month = f"{metadata.date_taken.month:02d}"
-                day = f"{metadata.date_taken.day:02d}"
-                date = metadata.date_taken.strftime("%Y-%m-%d")
-            else:
-                year = month = day = date = "Unknown"
-
-            counter = 1
-            while True:
-                filename = self.filename_pattern.format(
+            def candidate(counter: int) -> Path:
+                return base_dir / self._render(
                     date=date,
                     year=year,
                     month=month,
@@ -150,30 +223,92 @@ class PathGenerator:
                     ext=extension,
                     counter=f"_{counter}"
                 )
-                new_path = base_dir / filename
-                if not new_path.exists():
-                    logger.debug(f"Generated unique path with counter: {new_path.name}")
-                    return new_path
-                counter += 1
-
-                if counter > 1000:
-                    raise ValueError(f"Could not generate unique path for {target_path}")
         else:
             # Fallback: add counter before extension
             base_dir = target_path.parent
             stem = target_path.stem
             extension = target_path.suffix
 
-            counter = 1
-            while True:
-                new_path = base_dir / f"{stem}_{counter}{extension}"
-                if not new_path.exists():
-                    logger.debug(f"Generated unique path: {new_path.name}")
-                    return new_path
-                counter += 1
+            def candidate(counter: int) -> Path:
+                return base_dir / f"{stem}_{counter}{extension}"
 
-                if counter > 1000:
-                    raise ValueError(f"Could not generate unique path for {target_path}")
+        # Candidates normally live in base_dir, unless the pattern has a separator
+        names = self._list_names(candidate(1).parent)
+        while True:
+            new_path = candidate(self._find_free_counter(target_path, candidate, names))
+            # The listing can miss files placed without going through here
+            if not new_path.exists():
+                break
+            names.add(new_path.name)
+
+        names.add(new_path.name)
+        logger.debug(f"Generated unique path: {new_path.name}")
+        return new_path
+
+    def _list_names(self, dir_path: Path) -> Set[str]:
+        """
+        Get the (cached) set of entry names in a directory.
+
+        Args:
+            dir_path: Directory to list
+
+        Returns:
+            Mutable set of names (empty if the directory does not exist)
+        """
+        names = self._dir_names.get(dir_path)
+        if names is None:
+            try:
+                with os.scandir(dir_path) as entries:
+                    names = {entry.name for entry in entries}
+            except OSError:
+                names = set()
+            self._dir_names[dir_path] = names
+        return names
+
+    def _find_free_counter(self, target_path: Path, candidate: Callable[[int], Path],
+                           names: Set[str]) -> int:
+        """
+        Find a counter whose candidate name is not taken.
+
+        Probes exponentially from the last counter used for this path, then
+        binary-searches the last interval, so k existing duplicates cost
+        O(log k) probes instead of k. Counters are normally filled in order;
+        if some were deleted, any free counter may be returned.
+
+        Args:
+            target_path: Colliding path (key for the last-used counter)
+            candidate: Builds the path for a counter
+            names: Names already present in the candidates' directory
+
+        Returns:
+            Counter between 1 and MAX_UNIQUE_COUNTER
+
+        Raises:
+            ValueError: If no free counter is found
+        """
+        # Invariant: counter lo is taken (0 stands for target_path itself), hi is probed next
+        lo = self._last_counter.get(target_path, 0)
+        if lo and candidate(lo).name not in names:
+            lo = 0
+
+        step = 1
+        hi = lo + 1
+        while candidate(hi).name in names:
+            if hi >= MAX_UNIQUE_COUNTER:
+                raise ValueError(f"Could not generate unique path for {target_path}")
+            lo = hi
+            step *= 2
+            hi = min(lo + step, MAX_UNIQUE_COUNTER)
+
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if candidate(mid).name in names:
+                lo = mid
+            else:
+                hi = mid
+
+        self._last_counter[target_path] = hi
+        return hi
 
     def create_directory(self, dir_path: Path, dry_run: bool = False) -> bool:
         """
@@ -186,21 +321,34 @@ class PathGenerator:
         Returns:
             True if directory was created or already exists
         """
+        if dir_path in self._created_dirs:
+            return True
+
         if dir_path.exists():
+            self._created_dirs.add(dir_path)
             return True
 
         if dry_run:
             logger.debug(f"[DRY RUN] Would create directory: {dir_path}")
+            self._created_dirs.add(dir_path)
             return True
 
         try:
             dir_path.mkdir(parents=True, exist_ok=True)
             logger.debug(f"Created directory: {dir_path}")
-            return True
         except OSError as e:
             logger.error(f"Failed to create directory {dir_path}: {e}")
             return False
 
+        # mkdir(parents=True) also made every missing ancestor
+        self._created_dirs.add(dir_path)
+        self._dir_names[dir_path] = set()
+        for parent in dir_path.parents:
+            if parent == self.destination_root or parent in self._created_dirs:
+                break
+            self._created_dirs.add(parent)
+        return True
+
     def get_relative_path(self, full_path: Path) -> Path:
         """
         Get path relative to destination root.
@@ -211,6 +359,10 @@ class PathGenerator:
         Returns:
             Path relative to destination root
         """
+        path_str = str(full_path)
+        if path_str.startswith(self._root_prefix):
+            return Path(path_str[len(self._root_prefix):])
+
         try:
             return full_path.relative_to(self.destination_root)
         except ValueError:
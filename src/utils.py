@@ -3,10 +3,13 @@ Utility functions for logging, statistics, and helpers.
 """
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
 import json
 import hashlib
+import os
+import shutil
+import sys
 
 
 def setup_logging(log_file: Path = None, verbose: bool = False) -> logging.Logger:
@@ -54,6 +57,8 @@ def setup_logging(log_file: Path = None, verbose: bool = False) -> logging.Logge
 class Statistics:
     """Track and display execution statistics."""
 
+    MAX_ERRORS = 1000
+
     def __init__(self):
         self.start_time = datetime.now()
         self.total_files = 0
@@ -68,7 +73,9 @@ class Statistics:
         self.duplicates_found = 0
         self.api_calls_made = 0
         self.cache_hits = 0
+        # Only the first MAX_ERRORS messages are kept; the rest are counted
         self.errors: List[str] = []
+        self.errors_truncated = 0
 
     def record_processed(self):
         """Record a successfully processed file."""
@@ -82,7 +89,10 @@ class Statistics:
         """Record a failed file."""
         self.failed_files += 1
         if error_msg:
-            self.errors.append(error_msg)
+            if len(self.errors) < self.MAX_ERRORS:
+                self.errors.append(error_msg)
+            else:
+                self.errors_truncated += 1
 
     def record_gps(self, has_gps: bool):
         """Record GPS availability."""
@@ -106,9 +116,9 @@ class Statistics:
         """Record a duplicate file."""
         self.duplicates_found += 1
 
-    def record_api_call(self):
-        """Record an API call."""
-        self.api_calls_made += 1
+    def record_api_call(self, count: int = 1):
+        """Record geocoding API calls."""
+        self.api_calls_made += count
 
     def record_cache_hit(self):
         """Record a cache hit."""
@@ -141,7 +151,8 @@ class Statistics:
             'cache_hits': self.cache_hits,
             'elapsed_seconds': elapsed_seconds,
             'files_per_second': files_per_second,
-            'errors': self.errors
+            'errors': self.errors,
+            'errors_truncated': self.errors_truncated
         }
 
     def print_summary(self):
@@ -176,21 +187,32 @@ class Statistics:
         print(f"   Cache Hits: {summary['cache_hits']}")
 
         if summary['errors']:
-            print(f"\n⚠️  Errors ({len(summary['errors'])}):")
-            for error in summary['errors'][:5]:  # Show first 5 errors
+            error_count = len(summary['errors']) + summary['errors_truncated']
+            shown = summary['errors'][:5]  # Show first 5 errors
+            print(f"\n⚠️  Errors ({error_count}):")
+            for error in shown:
                 print(f"   - {error}")
-            if len(summary['errors']) > 5:
-                print(f"   ... and {len(summary['errors']) - 5} more")
+            if error_count > len(shown):
+                print(f"   ... and {error_count - len(shown)} more")
 
         print("\n" + "=" * 60 + "\n")
 
 
 class TransactionLog:
-    """Log file operations for potential rollback."""
+    """
+    Log file operations for potential rollback.
+
+    Records are appended to the log file as JSON lines, in batches of
+    FLUSH_EVERY, so each write costs the same however long the run is and a
+    crash loses at most one batch. Earlier runs' records are kept.
+    """
+
+    FLUSH_EVERY = 256
 
     def __init__(self, log_file: Path):
         self.log_file = log_file
-        self.transactions: List[Dict] = []
+        self.transactions: List[Dict] = []  # Not yet written to log_file
+        self._fh = None
 
     def log_operation(self, operation: str, source: Path, destination: Path,
                      success: bool, error: str = None):
@@ -213,21 +235,42 @@ class TransactionLog:
             'error': error
         }
         self.transactions.append(transaction)
+        if len(self.transactions) >= self.FLUSH_EVERY:
+            self.flush()
 
-    def save(self):
-        """Save transaction log to file."""
+    def flush(self):
+        """Append buffered records to the log file and sync it to disk."""
+        if not self.transactions:
+            return
         try:
-            with open(self.log_file, 'w') as f:
-                json.dump(self.transactions, f, indent=2)
+            if self._fh is None:
+                self._fh = open(self.log_file, 'a', encoding='utf-8')
+            self._fh.write("".join(
+                json.dumps(transaction, separators=(',', ':')) + "\n"
+                for transaction in self.transactions
+            ))
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self.transactions.clear()
         except Exception as e:
             logging.error(f"Failed to save transaction log: {e}")
 
+    def save(self):
+        """Write any buffered records and close the log file."""
+        self.flush()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
     def load(self) -> List[Dict]:
-        """Load transaction log from file."""
+        """Load transaction log from file (JSON lines, or a legacy JSON array)."""
         try:
             if self.log_file.exists():
-                with open(self.log_file, 'r') as f:
-                    return json.load(f)
+                with open(self.log_file, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                if text.lstrip().startswith('['):
+                    return json.loads(text)
+                return [json.loads(line) for line in text.splitlines() if line.strip()]
         except Exception as e:
             logging.error(f"Failed to load transaction log: {e}")
         return []
@@ -244,23 +287,98 @@ def calculate_file_hash(file_path: Path, algorithm: str = 'sha256') -> str:
     Returns:
         Hex digest of file hash
     """
+    # file_digest reads in large blocks and hashes in C without holding the GIL
+    with open(file_path, 'rb') as f:
+        return hashlib.file_digest(f, algorithm).hexdigest()
+
+
+def copy_file_with_hash(source: Path, destination: Path, algorithm: str = 'sha256',
+                        chunk_size: int = 1 << 20) -> str:
+    """
+    Copy a file (with metadata, like shutil.copy2) while hashing the source.
+
+    The source is read once, so the digest can be handed to
+    verify_file_integrity() instead of reading the source a second time.
+
+    Args:
+        source: Source file path
+        destination: Destination file path
+        algorithm: Hash algorithm ('md5', 'sha1', 'sha256')
+        chunk_size: Bytes read per iteration
+
+    Returns:
+        Hex digest of the source contents
+    """
     hash_obj = hashlib.new(algorithm)
 
-    with open(file_path, 'rb') as f:
-        # Read in chunks for large files
-        for chunk in iter(lambda: f.read(8192), b''):
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        for chunk in iter(lambda: src.read(chunk_size), b''):
             hash_obj.update(chunk)
+            dst.write(chunk)
 
+    shutil.copystat(source, destination)
     return hash_obj.hexdigest()
 
 
-def verify_file_integrity(source: Path, destination: Path) -> bool:
+# Linux ioctl that makes the destination share the source's extents (btrfs, XFS)
+_FICLONE = 0x40049409
+
+
+def clone_file(source: Path, destination: Path) -> bool:
+    """
+    Copy a file as a copy-on-write clone, if the filesystem supports it.
+
+    Clones (btrfs/XFS reflinks, APFS clonefile) share data blocks with the
+    source, so they take constant time regardless of file size.
+
+    Args:
+        source: Source file path
+        destination: Destination file path (must not exist yet)
+
+    Returns:
+        True if the clone was made; False (with nothing left behind) otherwise
+    """
+    try:
+        if sys.platform == 'darwin':
+            import ctypes
+
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.clonefile(os.fsencode(source), os.fsencode(destination), 0) != 0:
+                return False
+        elif sys.platform.startswith('linux'):
+            import fcntl
+
+            with open(source, 'rb') as src, open(destination, 'xb') as dst:
+                try:
+                    fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+                except OSError:
+                    dst.close()
+                    os.unlink(destination)
+                    return False
+        else:
+            return False
+
+        shutil.copystat(source, destination)
+        return True
+
+    except (OSError, AttributeError):
+        # Unsupported platform/filesystem, or the destination already exists
+        return False
+
+
+# Bytes compared per read in verify_file_integrity
+_COMPARE_BLOCK_SIZE = 1 << 20
+
+
+def verify_file_integrity(source: Path, destination: Path,
+                          source_digest: Optional[str] = None) -> bool:
     """
     Verify that two files are identical.
 
     Args:
         source: Source file path
         destination: Destination file path
+        source_digest: SHA-256 hex digest of the source, if already known
 
     Returns:
         True if files are identical
@@ -272,11 +390,18 @@ def verify_file_integrity(source: Path, destination: Path) -> bool:
     if source.stat().st_size != destination.stat().st_size:
         return False
 
-    # Full verification: hash comparison
-    source_hash = calculate_file_hash(source)
-    dest_hash = calculate_file_hash(destination)
+    # With the source digest known, only the destination has to be read
+    if source_digest:
+        return source_digest == calculate_file_hash(destination)
 
-    return source_hash == dest_hash
+    # Otherwise compare side by side, stopping at the first difference
+    with open(source, 'rb') as src, open(destination, 'rb') as dst:
+        while True:
+            source_block = src.read(_COMPARE_BLOCK_SIZE)
+            if source_block != dst.read(_COMPARE_BLOCK_SIZE):
+                return False
+            if not source_block:
+                return True
 
 
 def format_bytes(bytes_value: int) -> str:
@@ -306,7 +431,6 @@ def get_disk_space(path: Path) -> Dict[str, int]:
     Returns:
         Dictionary with 'total', 'used', 'free' in bytes
     """
-    import shutil
     stat = shutil.disk_usage(path)
 
     return {
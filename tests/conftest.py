@@ -0,0 +1,24 @@
+"""
+Shared test fixtures.
+"""
+import pytest
+
+from src.cache import GeocodingCache
+
+
+@pytest.fixture
+def cache_db_path(tmp_path):
+    """Path for a temporary cache database (removed with tmp_path)."""
+    return tmp_path / "cache.db"
+
+
+@pytest.fixture
+def geocoding_cache(cache_db_path):
+    """Create a temporary cache database."""
+    cache = GeocodingCache(cache_path=cache_db_path)
+    # Tests need no crash durability; WAL mode is kept since tests check it
+    cache.conn.execute("PRAGMA synchronous=OFF")
+
+    yield cache
+
+    cache.close()
@@ -2,32 +2,26 @@
 Tests for cache module.
 """
 import pytest
-from pathlib import Path
-import tempfile
+import os
+import sqlite3
 
 from src.cache import GeocodingCache
 
 
-@pytest.fixture
-def temp_cache():
-    """Create a temporary cache database."""
-    temp_file = Path(tempfile.mktemp(suffix='.db'))
-    cache = GeocodingCache(cache_path=temp_file)
+class _FailingCursor:
+    """Stand-in cursor that fails on any use."""
 
-    yield cache
-
-    cache.close()
-    if temp_file.exists():
-        temp_file.unlink()
+    def execute(self, *args):
+        raise AssertionError("SQLite should not be queried")
 
 
-def test_cache_initialization(temp_cache):
+def test_cache_initialization(geocoding_cache):
     """Test cache initialization creates database."""
-    assert temp_cache.cache_path.exists()
-    assert temp_cache.conn is not None
+    assert geocoding_cache.cache_path.exists()
+    assert geocoding_cache.conn is not None
 
 
-def test_cache_set_and_get(temp_cache):
+def test_cache_set_and_get(geocoding_cache):
     """Test storing and retrieving from cache."""
     location_data = {
         'location_name': 'CA-San_Francisco',
@@ -37,23 +31,23 @@ def test_cache_set_and_get(temp_cache):
         'city': 'San Francisco'
     }
 
-    temp_cache.set(37.7749, -122.4194, location_data)
+    geocoding_cache.set(37.7749, -122.4194, location_data)
 
-    result = temp_cache.get(37.7749, -122.4194)
+    result = geocoding_cache.get(37.7749, -122.4194)
 
     assert result is not None
     assert result['location_name'] == 'CA-San_Francisco'
     assert result['city'] == 'San Francisco'
 
 
-def test_cache_miss(temp_cache):
+def test_cache_miss(geocoding_cache):
     """Test cache miss returns None."""
-    result = temp_cache.get(40.7128, -74.0060)
+    result = geocoding_cache.get(40.7128, -74.0060)
 
     assert result is None
 
 
-def test_cache_rounding(temp_cache):
+def test_cache_rounding(geocoding_cache):
     """Test that cache uses coordinate rounding."""
     location_data = {
         'location_name': 'CA-San_Francisco',
@@ -64,15 +58,15 @@ def test_cache_rounding(temp_cache):
     }
 
     # Store with specific coordinates
-    temp_cache.set(37.7749, -122.4194, location_data)
+    geocoding_cache.set(37.7749, -122.4194, location_data)
 
     # Should find with slightly different coordinates (within rounding)
-    result = temp_cache.get(37.77491, -122.41941, precision=4)
+    result = geocoding_cache.get(37.77491, -122.41941, precision=4)
 
     assert result is not None
 
 
-def test_cache_replace(temp_cache):
+def test_cache_replace(geocoding_cache):
     """Test that cache updates existing entries."""
     location_data_1 = {
         'location_name': 'Location1',
@@ -90,16 +84,16 @@ def test_cache_replace(temp_cache):
         'city': 'Oakland'
     }
 
-    temp_cache.set(37.7749, -122.4194, location_data_1)
-    temp_cache.set(37.7749, -122.4194, location_data_2)
+    geocoding_cache.set(37.7749, -122.4194, location_data_1)
+    geocoding_cache.set(37.7749, -122.4194, location_data_2)
 
-    result = temp_cache.get(37.7749, -122.4194)
+    result = geocoding_cache.get(37.7749, -122.4194)
 
     assert result['location_name'] == 'Location2'
     assert result['city'] == 'Oakland'
 
 
-def test_cache_stats(temp_cache):
+def test_cache_stats(geocoding_cache):
     """Test cache statistics."""
     location_data = {
         'location_name': 'Test',
@@ -109,15 +103,17 @@ def test_cache_stats(temp_cache):
         'city': 'Test'
     }
 
-    temp_cache.set(37.7749, -122.4194, location_data)
-    temp_cache.set(40.7128, -74.0060, location_data)
+    geocoding_cache.set_many([
+        (37.7749, -122.4194, location_data),
+        (40.7128, -74.0060, location_data),
+    ])
 
-    stats = temp_cache.get_stats()
+    stats = geocoding_cache.get_stats()
 
     assert stats['total_entries'] == 2
 
 
-def test_cache_clear(temp_cache):
+def test_cache_clear(geocoding_cache):
     """Test clearing cache."""
     location_data = {
         'location_name': 'Test',
@@ -127,18 +123,16 @@ def test_cache_clear(temp_cache):
         'city': 'Test'
     }
 
-    temp_cache.set(37.7749, -122.4194, location_data)
-    temp_cache.clear()
+    geocoding_cache.set(37.7749, -122.4194, location_data)
+    geocoding_cache.clear()
 
-    stats = temp_cache.get_stats()
+    stats = geocoding_cache.get_stats()
     assert stats['total_entries'] == 0
 
 
-def test_cache_context_manager():
+def test_cache_context_manager(cache_db_path):
     """Test using cache as context manager."""
-    temp_file = Path(tempfile.mktemp(suffix='.db'))
-
-    with GeocodingCache(cache_path=temp_file) as cache:
+    with GeocodingCache(cache_path=cache_db_path) as cache:
         location_data = {
             'location_name': 'Test',
             'granularity': 'city',
@@ -151,12 +145,8 @@ def test_cache_context_manager():
     # Connection should be closed
     assert cache.conn is None
 
-    # Cleanup
-    if temp_file.exists():
-        temp_file.unlink()
-
 
-def test_cache_clear_unknown(temp_cache):
+def test_cache_clear_unknown(geocoding_cache):
     """Test clearing only Unknown entries from cache."""
     # Add some entries
     location_data_known = {
@@ -175,33 +165,35 @@ def test_cache_clear_unknown(temp_cache):
         'city': ''
     }
 
-    temp_cache.set(37.7749, -122.4194, location_data_known)
-    temp_cache.set(40.7608, -111.8910, location_data_unknown)
-    temp_cache.set(39.7392, -104.9903, location_data_unknown)
+    geocoding_cache.set_many([
+        (37.7749, -122.4194, location_data_known),
+        (40.7608, -111.8910, location_data_unknown),
+        (39.7392, -104.9903, location_data_unknown),
+    ])
 
     # Should have 3 entries (1 known, 2 unknown)
-    stats = temp_cache.get_stats()
+    stats = geocoding_cache.get_stats()
     assert stats['total_entries'] == 3
 
     # Clear unknown entries
-    removed = temp_cache.clear_unknown()
+    removed = geocoding_cache.clear_unknown()
     assert removed == 2
 
     # Should have 1 entry remaining
-    stats = temp_cache.get_stats()
+    stats = geocoding_cache.get_stats()
     assert stats['total_entries'] == 1
 
     # Verify the known entry is still there
-    result = temp_cache.get(37.7749, -122.4194)
+    result = geocoding_cache.get(37.7749, -122.4194)
     assert result is not None
     assert result['location_name'] == 'CA-San_Francisco'
 
     # Verify unknown entries are gone
-    assert temp_cache.get(40.7608, -111.8910) is None
-    assert temp_cache.get(39.7392, -104.9903) is None
+    assert geocoding_cache.get(40.7608, -111.8910) is None
+    assert geocoding_cache.get(39.7392, -104.9903) is None
 
 
-def test_cache_clear_unknown_when_none_exist(temp_cache):
+def test_cache_clear_unknown_when_none_exist(geocoding_cache):
     """Test clearing unknown when there are no unknown entries."""
     location_data = {
         'location_name': 'CA',
@@ -211,12 +203,281 @@ def test_cache_clear_unknown_when_none_exist(temp_cache):
         'city': ''
     }
 
-    temp_cache.set(37.7749, -122.4194, location_data)
+    geocoding_cache.set(37.7749, -122.4194, location_data)
 
     # Clear unknown entries (should be 0)
-    removed = temp_cache.clear_unknown()
+    removed = geocoding_cache.clear_unknown()
     assert removed == 0
 
     # Should still have 1 entry
-    stats = temp_cache.get_stats()
+    stats = geocoding_cache.get_stats()
     assert stats['total_entries'] == 1
+
+
+def test_cache_memory_tier_avoids_sqlite(geocoding_cache):
+    """Test that repeated lookups are served from the in-memory tier."""
+    location_data = {
+        'location_name': 'CA-San_Francisco',
+        'granularity': 'major_city',
+        'country': 'United States',
+        'state': 'California',
+        'city': 'San Francisco'
+    }
+
+    geocoding_cache.set(37.7749, -122.4194, location_data)
+
+    # Swap in a cursor that fails if SQLite is queried
+    cursor = geocoding_cache._get_cur
+    geocoding_cache._get_cur = _FailingCursor()
+    try:
+        result = geocoding_cache.get(37.77491, -122.41941)
+    finally:
+        geocoding_cache._get_cur = cursor
+
+    assert result['location_name'] == 'CA-San_Francisco'
+
+
+def test_cache_memory_tier_is_bounded(geocoding_cache):
+    """Test that the in-memory tier evicts the least recently used entry."""
+    geocoding_cache._mem_cap = 2
+    location_data = {'location_name': 'Test', 'granularity': 'city'}
+
+    geocoding_cache.set(1.0, 1.0, location_data)
+    geocoding_cache.set(2.0, 2.0, location_data)
+    geocoding_cache.get(1.0, 1.0)
+    geocoding_cache.set(3.0, 3.0, location_data)
+
+    assert list(geocoding_cache._mem) == [GeocodingCache.cell_key(1.0, 1.0),
+                                     GeocodingCache.cell_key(3.0, 3.0)]
+
+    # Evicted entries are still served from SQLite
+    assert geocoding_cache.get(2.0, 2.0)['location_name'] == 'Test'
+
+
+def test_cache_set_many(geocoding_cache):
+    """Test storing several entries in one transaction."""
+    geocoding_cache.set_many([
+        (37.7749, -122.4194, {'location_name': 'CA-San_Francisco', 'granularity': 'major_city'}),
+        (40.7128, -74.0060, {'location_name': 'NY-New_York', 'granularity': 'major_city'}),
+    ])
+
+    assert geocoding_cache.get_stats()['total_entries'] == 2
+    assert geocoding_cache.get(40.7128, -74.0060)['location_name'] == 'NY-New_York'
+
+
+def test_cache_uses_wal_journal(geocoding_cache):
+    """Test that the cache database is opened in WAL mode."""
+    mode = geocoding_cache.conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+    assert mode == 'wal'
+
+
+def test_cache_migrates_legacy_schema(tmp_path):
+    """Test that caches keyed on REAL coordinates are migrated to integer cells."""
+    db_path = tmp_path / "old_cache.db"
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript("""
+        CREATE TABLE geocoding_cache (
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            location_name TEXT NOT NULL,
+            granularity TEXT NOT NULL,
+            country TEXT,
+            state TEXT,
+            city TEXT,
+            cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (latitude, longitude)
+        );
+        CREATE INDEX idx_coords ON geocoding_cache(latitude, longitude);
+        INSERT INTO geocoding_cache (latitude, longitude, location_name, granularity, city)
+        VALUES (37.7749, -122.4194, 'CA-San_Francisco', 'major_city', 'San Francisco');
+    """)
+    conn.close()
+
+    with GeocodingCache(cache_path=db_path) as cache:
+        result = cache.get(37.77491, -122.41941)
+        indexes = {row[0] for row in cache.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        )}
+
+    assert result['location_name'] == 'CA-San_Francisco'
+    assert result['city'] == 'San Francisco'
+    assert 'idx_coords' not in indexes
+
+
+def test_cache_cell_key():
+    """Test that coordinates rounding together share one integer key."""
+    assert GeocodingCache.cell_key(37.77491, -122.41941) == GeocodingCache.cell_key(37.7749, -122.4194)
+    assert GeocodingCache.cell_key(37.7749, -122.4194) != GeocodingCache.cell_key(-122.4194, 37.7749)
+    assert GeocodingCache.cell_key(-90.0, -180.0) >= 0
+
+
+def test_cache_get_with_neighbors(geocoding_cache):
+    """Test that an adjacent cell satisfies a lookup without being persisted."""
+    geocoding_cache.set(37.7749, -122.4194, {
+        'location_name': 'CA-San_Francisco',
+        'granularity': 'major_city',
+        'country': 'United States',
+        'state': 'California',
+        'city': 'San Francisco'
+    })
+    geocoding_cache._mem.clear()
+
+    # One cell north-east of the cached entry
+    assert geocoding_cache.get(37.7750, -122.4193) is None
+    result = geocoding_cache.get_with_neighbors(37.7750, -122.4193)
+    assert result['location_name'] == 'CA-San_Francisco'
+    assert result['city'] == 'San Francisco'
+
+    # Remembered in memory for direct hits, but never written to SQLite
+    assert geocoding_cache.get(37.7750, -122.4193)['location_name'] == 'CA-San_Francisco'
+    geocoding_cache.flush()
+    assert geocoding_cache.get_stats()['total_entries'] == 1
+
+    # Two cells away is not a neighbor, even next to a derived entry
+    assert geocoding_cache.get_with_neighbors(37.7751, -122.4192) is None
+    assert geocoding_cache.get_with_neighbors(37.7749, -122.4196) is None
+
+
+def test_cache_get_many(geocoding_cache):
+    """Test batched lookup of several cells."""
+    geocoding_cache.set_many([
+        (37.7749, -122.4194, {'location_name': 'CA-San_Francisco', 'granularity': 'major_city'}),
+        (48.8566, 2.3522, {'location_name': 'France', 'granularity': 'country'}),
+    ])
+    geocoding_cache._mem.clear()
+
+    sf = GeocodingCache.cell_key(37.7749, -122.4194)
+    paris = GeocodingCache.cell_key(48.8566, 2.3522)
+    tokyo = GeocodingCache.cell_key(35.6762, 139.6503)
+
+    found = geocoding_cache.get_many([sf, paris, tokyo, sf])
+
+    assert set(found) == {sf, paris}
+    assert found[paris]['location_name'] == 'France'
+
+    # Results are now served from the in-memory tier
+    cursor = geocoding_cache._get_cur
+    geocoding_cache._get_cur = _FailingCursor()
+    try:
+        assert geocoding_cache.get(48.8566, 2.3522)['location_name'] == 'France'
+        assert geocoding_cache.get_many([sf]) == {sf: found[sf]}
+    finally:
+        geocoding_cache._get_cur = cursor
+
+
+def test_cache_hot_snapshot_warm_start(cache_db_path):
+    """Test that the in-memory tier is restored from the sidecar snapshot."""
+    location_data = {'location_name': 'France', 'granularity': 'country'}
+
+    with GeocodingCache(cache_path=cache_db_path) as cache:
+        cache.set(48.8566, 2.3522, location_data)
+    assert cache.hot_path.exists()
+
+    with GeocodingCache(cache_path=cache_db_path) as cache:
+        cursor = cache._get_cur
+        cache._get_cur = _FailingCursor()
+        try:
+            assert cache.get(48.8566, 2.3522)['location_name'] == 'France'
+        finally:
+            cache._get_cur = cursor
+
+
+def test_cache_hot_snapshot_ignored_when_stale(cache_db_path):
+    """Test that a snapshot older than the database is not loaded."""
+    with GeocodingCache(cache_path=cache_db_path) as cache:
+        cache.set(48.8566, 2.3522, {'location_name': 'France', 'granularity': 'country'})
+
+    hot_path = cache_db_path.with_suffix('.hot')
+    stat = cache_db_path.stat()
+    os.utime(hot_path, (stat.st_atime, stat.st_mtime - 60))
+
+    cache = GeocodingCache(cache_path=cache_db_path)
+    assert len(cache._mem) == 0
+    cache.close()
+
+
+def test_cache_in_memory_has_no_snapshot():
+    """Test that an in-memory database never writes a sidecar."""
+    cache = GeocodingCache(cache_path=':memory:')
+    assert cache.hot_path is None
+    cache.set(48.8566, 2.3522, {'location_name': 'France', 'granularity': 'country'})
+    cache.close()
+
+
+def test_cache_cached_at_from_column_default(geocoding_cache):
+    """Test that SQLite timestamps entries on insert."""
+    geocoding_cache.set(48.8566, 2.3522, {'location_name': 'France', 'granularity': 'country'})
+    geocoding_cache.flush()
+    geocoding_cache._mem.clear()
+
+    assert geocoding_cache.get(48.8566, 2.3522)['cached_at'] is not None
+    assert geocoding_cache.get_stats()['recent_entries'] == 1
+
+
+def test_cache_buffers_writes_until_flush(geocoding_cache):
+    """Test that writes are batched but always visible to lookups."""
+    reader = sqlite3.connect(str(geocoding_cache.cache_path))
+    count_sql = "SELECT COUNT(*) FROM geocoding_cache"
+    location_data = {'location_name': 'France', 'granularity': 'country'}
+
+    geocoding_cache.set(48.8566, 2.3522, location_data)
+    geocoding_cache._mem.clear()
+
+    # Buffered: not committed yet, but served to this cache instance
+    assert reader.execute(count_sql).fetchone()[0] == 0
+    assert geocoding_cache.get(48.8566, 2.3522)['location_name'] == 'France'
+    assert geocoding_cache.get_with_neighbors(48.8567, 2.3522)['location_name'] == 'France'
+
+    geocoding_cache.flush()
+    assert reader.execute(count_sql).fetchone()[0] == 1
+
+    # Reaching the batch size commits automatically
+    geocoding_cache.FLUSH_EVERY = 3
+    for i in range(3):
+        geocoding_cache.set(10.0 + i, 20.0, location_data)
+    assert reader.execute(count_sql).fetchone()[0] == 4
+    reader.close()
+
+
+def test_cache_concurrent_reads(geocoding_cache):
+    """Test that reader connections query the cache while it is written."""
+    import threading
+
+    geocoding_cache.set_many([(float(i), 0.0, {'location_name': f'Cell{i}', 'granularity': 'city'})
+                              for i in range(10)])
+    readers = [geocoding_cache.reader() for _ in range(4)]
+    errors = []
+
+    def read_all(conn):
+        try:
+            for _ in range(50):
+                names = {row[0] for row in conn.execute("SELECT location_name FROM geocoding_cache")}
+                assert {f'Cell{i}' for i in range(10)} <= names
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read_all, args=(conn,)) for conn in readers]
+    for thread in threads:
+        thread.start()
+    for i in range(10, 60):
+        geocoding_cache.set(float(i), 0.0, {'location_name': f'Cell{i}', 'granularity': 'city'})
+        geocoding_cache.flush()
+    for thread in threads:
+        thread.join(10)
+
+    with pytest.raises(sqlite3.OperationalError):
+        readers[0].execute("DELETE FROM geocoding_cache")
+    for conn in readers:
+        conn.close()
+
+    assert errors == []
+    assert geocoding_cache.get_stats()['total_entries'] == 60
+
+
+def test_cache_reader_needs_file():
+    """Test that an in-memory cache refuses a second connection."""
+    cache = GeocodingCache(cache_path=':memory:')
+    with pytest.raises(ValueError):
+        cache.reader()
+    cache.close()
@@ -3,7 +3,7 @@ Integration tests for exclusion patterns across the entire system.
 """
 import pytest
 from pathlib import Path
-import tempfile
+import os
 import shutil
 
 from src.scanner import MediaScanner
@@ -12,50 +12,48 @@ from src.location import LocationIntelligence
 from src.cache import GeocodingCache
 
 
-@pytest.fixture
-def complex_photo_structure():
-    """Create a complex directory structure for testing exclusions."""
-    temp_dir = Path(tempfile.mkdtemp())
-
+# Files of the shared exclusion test tree, relative to its root
+_PHOTO_TREE = [
     # Main photos
-    (temp_dir / "vacation.jpg").touch()
-    (temp_dir / "family.png").touch()
-
+    "vacation.jpg",
+    "family.png",
     # Thumbnails directory (should be excluded)
-    thumbs = temp_dir / "thumbnails"
-    thumbs.mkdir()
-    (thumbs / "vacation_thumb.jpg").touch()
-    (thumbs / "family_thumb.jpg").touch()
-
+    "thumbnails/vacation_thumb.jpg",
+    "thumbnails/family_thumb.jpg",
     # Cache directories (should be excluded)
-    cache1 = temp_dir / ".cache"
-    cache1.mkdir()
-    (cache1 / "cached1.jpg").touch()
+    ".cache/cached1.jpg",
+    "cache/cached2.jpg",
+    # Hidden directories (should be excluded)
+    ".hidden/secret.jpg",
+    # Good subdirectory (should be included)
+    "2023/trip.jpg",
+    "2023/adventure.mp4",
+    # Nested structure with thumbnails (should be excluded)
+    "2023/thumbnails/nested_thumb.jpg",
+]
 
-    cache2 = temp_dir / "cache"
-    cache2.mkdir()
-    (cache2 / "cached2.jpg").touch()
 
-    # Hidden directories (should be excluded)
-    hidden = temp_dir / ".hidden"
-    hidden.mkdir()
-    (hidden / "secret.jpg").touch()
+@pytest.fixture(scope="session")
+def complex_photo_structure(tmp_path_factory):
+    """
+    Create a complex directory structure for testing exclusions.
 
-    # Good subdirectory (should be included)
-    subdir = temp_dir / "2023"
-    subdir.mkdir()
-    (subdir / "trip.jpg").touch()
-    (subdir / "adventure.mp4").touch()
+    Built once and shared; tests that add files use writable_photo_structure.
+    """
+    temp_dir = tmp_path_factory.mktemp("photos")
 
-    # Nested structure with thumbnails (should be excluded)
-    nested_thumbs = subdir / "thumbnails"
-    nested_thumbs.mkdir()
-    (nested_thumbs / "nested_thumb.jpg").touch()
+    for relative in _PHOTO_TREE:
+        file_path = temp_dir / relative
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        os.close(os.open(file_path, os.O_CREAT | os.O_WRONLY, 0o644))
 
-    yield temp_dir
+    return temp_dir
 
-    # Cleanup
-    shutil.rmtree(temp_dir)
+
+@pytest.fixture
+def writable_photo_structure(complex_photo_structure, tmp_path):
+    """Private copy of complex_photo_structure that a test may modify."""
+    return Path(shutil.copytree(complex_photo_structure, tmp_path / "photos"))
 
 
 def test_scanner_with_multiple_exclusions(complex_photo_structure):
@@ -84,41 +82,29 @@ def test_scanner_with_multiple_exclusions(complex_photo_structure):
     assert 'secret.jpg' not in file_names
 
 
-def test_organizer_respects_exclusions(complex_photo_structure):
+def test_organizer_respects_exclusions(complex_photo_structure, tmp_path):
     """Test that PhotoOrganizer respects exclusion patterns."""
-    temp_dest = Path(tempfile.mkdtemp())
-    temp_cache = Path(tempfile.mktemp(suffix='.db'))
-
-    try:
-        cache = GeocodingCache(cache_path=temp_cache)
-        location_intel = LocationIntelligence(cache=cache)
-
-        organizer = PhotoOrganizer(
-            source_path=complex_photo_structure,
-            destination_path=temp_dest,
-            location_intelligence=location_intel,
-            mode='copy',
-            dry_run=True,
-            exclude_patterns=['thumbnails', '.cache', 'cache', '.hidden']
-        )
-
-        # Get preview
-        preview = organizer.preview(limit=20)
-
-        # Should only preview 4 files
-        assert len(preview) == 4
+    cache = GeocodingCache(cache_path=tmp_path / "cache.db")
+    location_intel = LocationIntelligence(cache=cache)
+
+    organizer = PhotoOrganizer(
+        source_path=complex_photo_structure,
+        destination_path=tmp_path / "library",
+        location_intelligence=location_intel,
+        mode='copy',
+        dry_run=True,
+        exclude_patterns=['thumbnails', '.cache', 'cache', '.hidden']
+    )
 
-        # Verify thumbnails and cache files are not in preview
-        preview_sources = [item['source'] for item in preview]
-        assert all('thumbnails' not in src for src in preview_sources)
-        assert all('.cache' not in src for src in preview_sources)
-        assert all('cache' not in src or 'cache' not in Path(src).parts for src in preview_sources)
-        assert all('.hidden' not in src for src in preview_sources)
+    # Get preview
+    preview = organizer.preview(limit=20)
+    location_intel.close()
 
-    finally:
-        shutil.rmtree(temp_dest)
-        if temp_cache.exists():
-            temp_cache.unlink()
+    # Only the four files outside thumbnails, cache and hidden directories
+    preview_sources = {Path(item['source']).relative_to(complex_photo_structure).as_posix()
+                       for item in preview}
+    assert len(preview) == 4
+    assert preview_sources == {'vacation.jpg', 'family.png', '2023/trip.jpg', '2023/adventure.mp4'}
 
 
 def test_wildcard_exclusion_pattern(complex_photo_structure):
@@ -169,10 +155,10 @@ def test_empty_exclusion_list(complex_photo_structure):
     assert len(files) == 10
 
 
-def test_case_sensitive_exclusion(complex_photo_structure):
+def test_case_sensitive_exclusion(writable_photo_structure):
     """Test that exclusion patterns work with different casing."""
     # Create differently named directory
-    thumbs_alt = complex_photo_structure / "Thumbs"  # Different casing
+    thumbs_alt = writable_photo_structure / "Thumbs"  # Different casing
     thumbs_alt.mkdir()
     (thumbs_alt / "alt_thumb.jpg").touch()
 
@@ -180,7 +166,7 @@ def test_case_sensitive_exclusion(complex_photo_structure):
 
     # Exclude only lowercase 'thumbnails' (exact match)
     files = scanner.scan(
-        complex_photo_structure,
+        writable_photo_structure,
         recursive=True,
         exclude_patterns=['thumbnails']  # This won't match 'Thumbs'
     )
@@ -191,10 +177,10 @@ def test_case_sensitive_exclusion(complex_photo_structure):
     assert 'vacation_thumb.jpg' not in file_names  # From thumbnails
 
 
-def test_multiple_levels_of_exclusion(complex_photo_structure):
+def test_multiple_levels_of_exclusion(writable_photo_structure):
     """Test exclusions at different directory levels."""
     # Create multi-level structure
-    level1 = complex_photo_structure / "level1"
+    level1 = writable_photo_structure / "level1"
     level1.mkdir()
     (level1 / "photo1.jpg").touch()
 
@@ -208,7 +194,7 @@ def test_multiple_levels_of_exclusion(complex_photo_structure):
 
     scanner = MediaScanner()
     files = scanner.scan(
-        complex_photo_structure,
+        writable_photo_structure,
         recursive=True,
         exclude_patterns=['cache']
     )
@@ -244,3 +230,21 @@ def test_exclusion_statistics(complex_photo_structure):
     # 2 from /thumbnails, 1 from /.cache, 1 from /2023/thumbnails, 1 from /cache
     excluded_count = len(files_without_exclusion) - len(files_with_exclusion)
     assert excluded_count >= 4  # At least the thumbnail and cache files
+
+
+def test_scanner_prunes_excluded_dirs(complex_photo_structure, monkeypatch):
+    """Test that excluded directories are never listed."""
+    from src import scanner as scanner_module
+
+    listed = []
+    real_scandir = os.scandir
+
+    def counting_scandir(path):
+        listed.append(Path(path).relative_to(complex_photo_structure).as_posix())
+        return real_scandir(path)
+
+    monkeypatch.setattr(scanner_module.os, 'scandir', counting_scandir)
+
+    MediaScanner().scan(complex_photo_structure, exclude_patterns=['thumbnails', 'cache'])
+
+    assert sorted(listed) == ['.', '.cache', '.hidden', '2023']
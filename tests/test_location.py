@@ -2,35 +2,44 @@
 Tests for location module.
 """
 import pytest
-from pathlib import Path
-import tempfile
+from types import SimpleNamespace
 
 from src.location import LocationIntelligence
 from src.cache import GeocodingCache
 
 
-@pytest.fixture
-def temp_cache():
-    """Create a temporary cache for testing."""
-    temp_file = Path(tempfile.mktemp(suffix='.db'))
-    cache = GeocodingCache(cache_path=temp_file)
+class _OfflineGeocoder:
+    """Stand-in for Nominatim that answers from a fixed address table."""
 
-    yield cache
+    def __init__(self, addresses=None):
+        self.addresses = addresses or {}
+        self.calls = []
 
-    cache.close()
-    if temp_file.exists():
-        temp_file.unlink()
+    def reverse(self, coords, language=None):
+        self.calls.append(coords)
+        address = self.addresses.get(coords)
+        return SimpleNamespace(raw={'address': address}) if address else None
 
 
 @pytest.fixture
-def location_intel(temp_cache):
+def location_intel(geocoding_cache):
     """Create LocationIntelligence instance for testing."""
     return LocationIntelligence(
-        cache=temp_cache,
-        locationiq_api_key=None  # Use only Nominatim for tests
+        cache=geocoding_cache,
+        locationiq_api_key=None,  # Use only the fallback geocoder for tests
+        geocoder=_OfflineGeocoder()  # Never reaches the network
     )
 
 
+@pytest.fixture(scope="module")
+def granularity_intel():
+    """Shared LocationIntelligence for tests of the pure granularity rules."""
+    intel = LocationIntelligence(cache=GeocodingCache(cache_path=':memory:'),
+                                 geocoder=_OfflineGeocoder())
+    yield intel
+    intel.close()
+
+
 def test_haversine_distance(location_intel):
     """Test distance calculation between coordinates."""
     # San Francisco to Los Angeles (approximately 380 miles)
@@ -70,6 +79,7 @@ def test_normalize_name(location_intel):
     assert location_intel._normalize_name("San Francisco") == "San_Francisco"
     assert location_intel._normalize_name("New York City") == "New_York_City"
     assert location_intel._normalize_name("Test-Location") == "Test-Location"
+    assert location_intel._normalize_name("Zürich (Altstadt)") == "Zürich_Altstadt"
 
 
 def test_state_abbreviation(location_intel):
@@ -79,64 +89,30 @@ def test_state_abbreviation(location_intel):
     assert location_intel._get_state_abbreviation("Unknown") == "Unknown"
 
 
-def test_apply_granularity_foreign_country(location_intel):
-    """Test granularity for foreign countries."""
-    location_data = {
-        'country': 'France',
-        'state': 'Île-de-France',
-        'city': 'Paris',
-        'county': ''
-    }
-
-    result = location_intel._apply_granularity_rules(location_data)
-
-    assert result == "France"
-    assert location_data['granularity'] == 'country'
-
-
-def test_apply_granularity_us_major_city(location_intel):
-    """Test granularity for US major cities."""
-    location_data = {
-        'country': 'United States',
-        'state': 'California',
-        'city': 'San Francisco',
-        'county': ''
-    }
-
-    result = location_intel._apply_granularity_rules(location_data)
-
-    assert result == "CA-San_Francisco"
-    assert location_data['granularity'] == 'major_city'
-
-
-def test_apply_granularity_us_rural(location_intel):
-    """Test granularity for US rural areas."""
-    location_data = {
-        'country': 'United States',
-        'state': 'Montana',
-        'city': 'Small Town',
-        'county': ''
-    }
-
-    result = location_intel._apply_granularity_rules(location_data)
-
-    assert result == "MT"
-    assert location_data['granularity'] == 'state'
-
-
-def test_apply_granularity_national_park(location_intel):
-    """Test granularity for national parks."""
-    location_data = {
-        'country': 'United States',
-        'state': 'California',
-        'city': '',
-        'county': 'Yosemite National Park'
-    }
-
-    result = location_intel._apply_granularity_rules(location_data)
-
-    assert result == "CA-Yosemite"
-    assert location_data['granularity'] == 'national_park'
+@pytest.mark.parametrize("location_data, expected, granularity", [
+    # Foreign countries
+    ({'country': 'France', 'state': 'Île-de-France', 'city': 'Paris', 'county': ''},
+     "France", 'country'),
+    # US major cities
+    ({'country': 'United States', 'state': 'California', 'city': 'San Francisco', 'county': ''},
+     "CA-San_Francisco", 'major_city'),
+    # US rural areas
+    ({'country': 'United States', 'state': 'Montana', 'city': 'Small Town', 'county': ''},
+     "MT", 'state'),
+    # National parks
+    ({'country': 'United States', 'state': 'California', 'city': '', 'county': 'Yosemite National Park'},
+     "CA-Yosemite", 'national_park'),
+    # Park names are also matched against the city field
+    ({'country': 'United States', 'state': 'Utah', 'city': 'Springdale near Zion',
+      'county': 'Washington County'},
+     "UT-Zion", 'national_park'),
+])
+def test_apply_granularity(granularity_intel, location_data, expected, granularity):
+    """Test granularity rules for each kind of location."""
+    result = granularity_intel._apply_granularity_rules(location_data)
+
+    assert result == expected
+    assert location_data['granularity'] == granularity
 
 
 def test_cache_integration(location_intel):
@@ -158,10 +134,194 @@ def test_cache_integration(location_intel):
     assert result == 'CA-San_Francisco'
 
 
-def test_context_manager(temp_cache):
+def test_context_manager(geocoding_cache):
     """Test LocationIntelligence as context manager."""
-    with LocationIntelligence(cache=temp_cache) as loc_intel:
+    with LocationIntelligence(cache=geocoding_cache) as loc_intel:
         assert loc_intel.cache is not None
 
     # Cache should be closed
-    assert temp_cache.conn is None
+    assert geocoding_cache.conn is None
+
+
+def test_apply_granularity_custom_lists(geocoding_cache):
+    """Test granularity rules with custom city and park lists."""
+    location_intel = LocationIntelligence(
+        cache=geocoding_cache,
+        major_cities={'Boise'},
+        national_parks={'Kings Canyon', 'Canyon'}
+    )
+
+    park = location_intel._apply_granularity_rules({
+        'country': 'United States', 'state': 'California',
+        'city': '', 'county': 'Kings Canyon National Park'
+    })
+    city = location_intel._apply_granularity_rules({
+        'country': 'United States', 'state': 'Idaho',
+        'city': 'Boise', 'county': ''
+    })
+
+    assert park == "CA-Kings_Canyon"
+    assert city == "ID-Boise"
+
+
+def test_prefetch_geocodes_each_cell_once(location_intel, monkeypatch):
+    """Test that prefetched results are reused by get_location_name."""
+    calls = []
+
+    def fake_geocode(lat, lon):
+        calls.append((lat, lon))
+        return {'country': 'France', 'state': '', 'city': 'Paris', 'county': ''}
+
+    monkeypatch.setattr(location_intel, '_geocode', fake_geocode)
+
+    submitted = location_intel.prefetch([(48.8566, 2.3522), (48.85661, 2.35221)])
+    result = location_intel.get_location_name(48.8566, 2.3522)
+
+    assert submitted == 1
+    assert result == "France"
+    assert calls == [(48.8566, 2.3522)]
+    assert location_intel.cache.get(48.8566, 2.3522)['location_name'] == "France"
+
+    # Cached coordinates are not submitted again
+    assert location_intel.prefetch([(48.8566, 2.3522)]) == 0
+    location_intel.close()
+
+
+def test_rate_limit_spaces_calls(location_intel, monkeypatch):
+    """Test that consecutive API calls are spaced by the minimum interval."""
+    sleeps = []
+    monkeypatch.setattr("src.location.time.sleep", sleeps.append)
+    location_intel.min_api_interval = 1.0
+
+    location_intel._rate_limit()
+    location_intel._rate_limit()
+
+    assert len(sleeps) == 1
+    assert 0 < sleeps[0] <= 1.0
+
+
+def test_locationiq_reuses_http_session(geocoding_cache, monkeypatch):
+    """Test that LocationIQ requests go through the shared keep-alive session."""
+    intel = LocationIntelligence(cache=geocoding_cache, locationiq_api_key="test-key")
+    intel.min_api_interval = 0
+    calls = []
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {'address': {'country': 'Japan', 'city': 'Kyoto'}}
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(params['lat'])
+        return FakeResponse()
+
+    monkeypatch.setattr(intel._http, 'get', fake_get)
+
+    assert intel._geocode_locationiq(35.0116, 135.7681)['city'] == 'Kyoto'
+    assert intel._geocode_locationiq(35.0117, 135.7682)['city'] == 'Kyoto'
+    assert calls == [35.0116, 35.0117]
+    assert intel._http.headers['User-Agent'] == 'photo-organizer/1.0'
+    intel.close()
+
+
+def test_cache_hit_skips_granularity_rules(location_intel, monkeypatch):
+    """Test that granularity rules run once per cell and never on cache hits."""
+    monkeypatch.setattr(location_intel, '_geocode', lambda lat, lon: {
+        'country': 'United States', 'state': 'Utah', 'city': 'Springdale', 'county': 'Zion'
+    })
+    calls = []
+    apply_rules = location_intel._apply_granularity_rules
+
+    def counting_rules(location_data):
+        calls.append(location_data)
+        return apply_rules(location_data)
+
+    monkeypatch.setattr(location_intel, '_apply_granularity_rules', counting_rules)
+
+    assert location_intel.get_location_name(37.1983, -112.9869) == "UT-Zion"
+    location_intel.cache._mem.clear()
+    assert location_intel.get_location_name(37.1983, -112.9869) == "UT-Zion"
+    assert len(calls) == 1
+
+
+def test_apply_granularity_us_country_variants(granularity_intel):
+    """Test that every spelling of the US used by geocoders is recognized."""
+    for country in ('United States', 'United States of America', 'USA', 'US', ' united states '):
+        location_data = {'country': country, 'state': 'Oregon', 'city': 'Bend', 'county': ''}
+        assert granularity_intel._apply_granularity_rules(location_data) == "OR"
+
+    location_data = {'country': 'Australia', 'state': '', 'city': 'Perth', 'county': ''}
+    assert granularity_intel._apply_granularity_rules(location_data) == "Australia"
+
+
+def test_failed_lookup_is_not_repeated(location_intel, monkeypatch):
+    """Test that a cell that failed to geocode is not retried in the same run."""
+    calls = []
+
+    def failing_geocode(lat, lon):
+        calls.append((lat, lon))
+        return None
+
+    monkeypatch.setattr(location_intel, '_geocode', failing_geocode)
+
+    assert location_intel.get_location_name(12.3456, 65.4321) == "Unknown"
+    assert location_intel.get_location_name(12.34561, 65.43211) == "Unknown"
+    assert location_intel.prefetch([(12.3456, 65.4321)]) == 0
+    assert len(calls) == 1
+
+    # Failures are not persisted
+    assert location_intel.cache.get(12.3456, 65.4321) is None
+
+
+def test_concurrent_lookups_share_one_geocode(location_intel, monkeypatch):
+    """Test that lookups arriving while a cell is being geocoded wait for it."""
+    import threading
+    import time
+
+    calls = []
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            location_intel.get_location_name(35.0116, 135.7681)))
+        for _ in range(4)
+    ]
+
+    def slow_geocode(lat, lon):
+        calls.append((lat, lon))
+        # Other callers arrive while this lookup is still in flight; they
+        # must not touch the cache (its connection belongs to this thread)
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        return {'country': 'Japan', 'state': '', 'city': 'Kyoto', 'county': ''}
+
+    monkeypatch.setattr(location_intel, '_geocode', slow_geocode)
+
+    assert location_intel.get_location_name(35.0116, 135.7681) == "Japan"
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["Japan"] * 4
+    assert len(calls) == 1
+
+
+def test_injected_geocoder_replaces_nominatim(geocoding_cache):
+    """Test that a geocoder passed in is used instead of Nominatim."""
+    geocoder = _OfflineGeocoder({
+        (46.5197, 6.6323): {'country': 'Switzerland', 'town': 'Lausanne'}
+    })
+    intel = LocationIntelligence(cache=geocoding_cache, geocoder=geocoder)
+    intel.min_api_interval = 0
+
+    assert intel.nominatim is geocoder
+    assert intel.get_location_name(46.5197, 6.6323) == "Switzerland"
+    assert intel.get_location_name(1.0, 1.0) == "Unknown"
+    assert geocoder.calls == [(46.5197, 6.6323), (1.0, 1.0)]
+    assert intel.api_calls == 2
+
+    # Memoized and cached cells are not looked up again
+    intel.get_location_name(46.5197, 6.6323)
+    intel.get_location_name(1.0, 1.0)
+    assert intel.api_calls == 2
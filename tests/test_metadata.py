@@ -0,0 +1,212 @@
+"""
+Tests for metadata module.
+"""
+import pytest
+import stat
+import sys
+from datetime import datetime
+
+from PIL import Image
+
+from src import metadata as metadata_module
+from src.metadata import MetadataExtractor, extract_metadata
+
+
+FAKE_EXIFTOOL = '''#!{python}
+"""Minimal stand-in for "exiftool -stay_open True -@ -"."""
+import json
+import sys
+from pathlib import Path
+
+with open({log!r}, "a") as log:
+    log.write("start\\n")
+
+args = []
+for line in sys.stdin:
+    line = line.rstrip("\\n")
+    if line.startswith("-execute"):
+        with open({log!r}, "a") as log:
+            log.write("execute\\n")
+        files = [arg for arg in args if not arg.startswith("-") and Path(arg).exists()]
+        if files:
+            print(json.dumps([{{
+                "SourceFile": name,
+                "QuickTime:CreateDate": "2023:06:15 10:30:00",
+                "Composite:GPSLatitude": 37.7749,
+                "Composite:GPSLongitude": -122.4194,
+            }} for name in files]))
+        print("{{ready" + line[len("-execute"):] + "}}", flush=True)
+        args = []
+    elif args[-1:] == ["-stay_open"] and line == "False":
+        break
+    else:
+        args.append(line)
+'''
+
+
+@pytest.fixture
+def fake_exiftool(tmp_path, monkeypatch):
+    """Point the extractor at a fake stay-open exiftool and return its start log."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "exiftool.log"
+
+    script = bin_dir / "exiftool"
+    script.write_text(FAKE_EXIFTOOL.format(python=sys.executable, log=str(log)))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+
+    monkeypatch.setattr(metadata_module, "_EXIFTOOL_PATH", str(script))
+    return log
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="fake exiftool is a shebang script")
+def test_exiftool_worker_is_reused(fake_exiftool, tmp_path):
+    """Test that one exiftool process serves every file until closed."""
+    clips = [tmp_path / "clip1.avi", tmp_path / "clip2.avi"]
+    for clip in clips:
+        clip.write_bytes(b"RIFF")
+
+    extractor = MetadataExtractor()
+    try:
+        results = [extractor.extract(clip) for clip in clips]
+        proc = extractor._et_proc
+    finally:
+        extractor.close()
+
+    for metadata in results:
+        assert metadata.date_taken == datetime(2023, 6, 15, 10, 30)
+        assert metadata.gps_coords == (37.7749, -122.4194)
+
+    assert fake_exiftool.read_text().count("start") == 1
+    assert proc.returncode == 0
+    assert extractor._et_proc is None
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="fake exiftool is a shebang script")
+def test_exiftool_worker_empty_reply(fake_exiftool, tmp_path):
+    """Test that an empty reply does not desynchronize later queries."""
+    clip = tmp_path / "clip.avi"
+    clip.write_bytes(b"RIFF")
+
+    extractor = MetadataExtractor()
+    try:
+        output = extractor._query_exiftool([tmp_path / "missing.avi"])
+        metadata = extractor.extract(clip)
+    finally:
+        extractor.close()
+
+    assert output == b""
+    assert metadata.gps_coords == (37.7749, -122.4194)
+
+
+def test_extract_metadata_reuses_default_extractor(tmp_path, monkeypatch):
+    """Test that the convenience function shares one extractor."""
+    monkeypatch.setattr(metadata_module, "_DEFAULT_EXTRACTOR", None)
+    photo = tmp_path / "photo.jpg"
+    photo.touch()
+
+    first = extract_metadata(photo)
+    extractor = metadata_module._DEFAULT_EXTRACTOR
+    second = extract_metadata(photo)
+
+    assert extractor is not None
+    assert metadata_module._DEFAULT_EXTRACTOR is extractor
+    assert first.date_taken == second.date_taken
+
+
+def test_extract_dispatches_on_extension(tmp_path, monkeypatch):
+    """Test that each extension family reaches its handler, case-insensitively."""
+    calls = []
+    for name in ('_extract_image_metadata', '_extract_raw_metadata',
+                 '_extract_video_metadata', '_extract_video_metadata_fallback'):
+        monkeypatch.setattr(MetadataExtractor, name,
+                            lambda self, path, md, name=name: calls.append((path.name, name)))
+
+    extractor = MetadataExtractor()
+    for file_name in ('a.JPG', 'b.nef', 'c.mov', 'd.mkv', 'e.txt'):
+        (tmp_path / file_name).touch()
+        extractor.extract(tmp_path / file_name)
+
+    assert calls == [
+        ('a.JPG', '_extract_image_metadata'),
+        ('b.nef', '_extract_raw_metadata'),
+        ('c.mov', '_extract_video_metadata'),
+        ('d.mkv', '_extract_video_metadata_fallback'),
+    ]
+
+
+def test_image_metadata_from_exif(tmp_path):
+    """Test that date, camera and dimensions are read from a JPEG."""
+    exif = Image.Exif()
+    exif[0x0132] = "2022:08:01 09:15:00"  # DateTime
+    exif[0x010F] = "Canon"  # Make
+
+    photo = tmp_path / "photo.jpg"
+    Image.new("RGB", (32, 24)).save(photo, "JPEG", exif=exif)
+
+    metadata = MetadataExtractor().extract(photo)
+
+    assert metadata.date_taken == datetime(2022, 8, 1, 9, 15)
+    assert metadata.camera_make == "Canon"
+    assert (metadata.width, metadata.height) == (32, 24)
+
+
+def test_image_metadata_with_mismatched_extension(tmp_path):
+    """Test that a PNG saved with a .jpg extension is still read."""
+    photo = tmp_path / "really_a_png.jpg"
+    Image.new("RGB", (8, 6)).save(photo, "PNG")
+
+    metadata = MetadataExtractor().extract(photo)
+
+    assert (metadata.width, metadata.height) == (8, 6)
+
+
+@pytest.mark.parametrize("date_value, expected", [
+    ("2023:06:15 10:30:00", datetime(2023, 6, 15, 10, 30)),
+    ("2023-06-15 10:30:00", datetime(2023, 6, 15, 10, 30)),
+    ("2023-06-15T10:30:00Z", datetime(2023, 6, 15, 10, 30)),
+    ("2023:06:15 10:30:00.25", datetime(2023, 6, 15, 10, 30)),
+    ("2023:06:15", datetime(2023, 6, 15)),
+    ("2023:06:15 10:30:00-07:00", datetime(2023, 6, 15, 10, 30)),
+    ("2023:06:15 10:30", None),
+    ("2023:06:15 garbage", None),
+    ("0000:00:00 00:00:00", None),
+    ("not a date", None),
+    ("", None),
+])
+def test_parse_exiftool_date(date_value, expected):
+    """Test exiftool date parsing across the supported layouts."""
+    assert MetadataExtractor()._parse_exiftool_date(date_value) == expected
+
+
+def test_parse_exif_and_video_dates():
+    """Test EXIF and video date parsing."""
+    extractor = MetadataExtractor()
+
+    assert extractor._parse_exif_date("2021:12:31 23:59:59") == datetime(2021, 12, 31, 23, 59, 59)
+    assert extractor._parse_exif_date("2021:13:01 00:00:00") is None
+    assert extractor._parse_video_date("2021-12-31") == datetime(2021, 12, 31)
+    assert extractor._parse_video_date("2021-12-31T08:00:00+02:00") == datetime(2021, 12, 31, 8)
+    assert extractor._parse_video_date("sometime") is None
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="fake exiftool is a shebang script")
+def test_extract_batch_shares_exiftool_call(fake_exiftool, tmp_path):
+    """Test that a batch sends every video to exiftool in one request."""
+    files = [tmp_path / "clip1.avi", tmp_path / "clip2.mkv", tmp_path / "photo.png"]
+    for file_path in files[:2]:
+        file_path.write_bytes(b"RIFF")
+    Image.new("RGB", (4, 4)).save(files[2], "PNG")
+
+    extractor = MetadataExtractor()
+    try:
+        results = extractor.extract_batch(files + [tmp_path / "gone.avi"])
+    finally:
+        extractor.close()
+
+    assert list(results) == files
+    assert results[files[0]].gps_coords == (37.7749, -122.4194)
+    assert results[files[1]].date_taken == datetime(2023, 6, 15, 10, 30)
+    assert results[files[2]].width == 4
+    # One batched query, plus a single retry for the file exiftool skipped
+    assert fake_exiftool.read_text().count("execute") == 2
@@ -0,0 +1,287 @@
+"""
+Tests for organizer module.
+"""
+import pytest
+from pathlib import Path
+
+from src import organizer as organizer_module
+from src.organizer import PhotoOrganizer
+from src.location import LocationIntelligence
+from src.cache import GeocodingCache
+
+
+@pytest.fixture
+def organizer(tmp_path):
+    """Create an organizer over a small source tree."""
+    source = tmp_path / "source"
+    source.mkdir()
+    for name in ("a.jpg", "b.png", "c.mp4"):
+        (source / name).touch()
+
+    cache = GeocodingCache(cache_path=':memory:')
+    org = PhotoOrganizer(
+        source_path=source,
+        destination_path=tmp_path / "dest",
+        location_intelligence=LocationIntelligence(cache=cache),
+        dry_run=True
+    )
+
+    yield org
+
+    org.location_intelligence.close()
+
+
+def test_parallel_metadata_matches_sequential(organizer, monkeypatch):
+    """Test that the worker-process path returns the same metadata in order."""
+    media_files = organizer.scanner.scan(organizer.source_path)
+
+    sequential = organizer._extract_all(media_files)
+
+    monkeypatch.setattr(organizer_module, "PARALLEL_METADATA_MIN_FILES", 0)
+    monkeypatch.setattr(organizer_module, "METADATA_WORKERS", 2)
+    parallel = organizer._extract_all(media_files)
+
+    assert [m.file_path for m in parallel] == media_files
+    assert [m.date_taken for m in parallel] == [m.date_taken for m in sequential]
+
+
+def test_move_renames_on_same_filesystem(tmp_path, monkeypatch):
+    """Test that moves within one filesystem use os.rename, not shutil.move."""
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "a.jpg").write_bytes(b"jpeg")
+
+    org = PhotoOrganizer(
+        source_path=source,
+        destination_path=tmp_path / "dest",
+        location_intelligence=LocationIntelligence(cache=GeocodingCache(cache_path=':memory:')),
+        mode='move',
+        verify=False
+    )
+    monkeypatch.setattr(organizer_module.shutil, "move",
+                        lambda *args: pytest.fail("shutil.move should not be used"))
+
+    stats = org.organize()
+    org.location_intelligence.close()
+
+    assert stats.processed_files == 1
+    assert not (source / "a.jpg").exists()
+    assert [p.read_bytes() for p in (tmp_path / "dest").rglob("*.jpg")] == [b"jpeg"]
+
+
+def test_iter_metadata_yields_ordered_chunks(organizer, monkeypatch):
+    """Test that pipelined extraction covers every file once, in order."""
+    monkeypatch.setattr(organizer_module, "METADATA_CHUNK_SIZE", 2)
+    media_files = organizer.scanner.scan(organizer.source_path)
+
+    chunks = list(organizer._iter_metadata(media_files))
+
+    assert [len(chunk) for chunk, _ in chunks] == [2, 1]
+    assert [m.file_path for _, results in chunks for m in results] == media_files
+
+
+def test_stopping_metadata_early_cancels_queued_chunks(organizer, monkeypatch):
+    """Test that abandoning the pipeline cancels chunks the pool has not run."""
+    shutdowns = []
+
+    class RecordingPool:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def map(self, fn, chunks):
+            return iter([[None] * len(chunk) for chunk in chunks])
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            shutdowns.append(cancel_futures)
+
+    monkeypatch.setattr(organizer_module, "PARALLEL_METADATA_MIN_FILES", 0)
+    monkeypatch.setattr(organizer_module, "METADATA_WORKERS", 2)
+    monkeypatch.setattr(organizer_module, "METADATA_CHUNK_SIZE", 1)
+    monkeypatch.setattr(organizer_module, "ProcessPoolExecutor", RecordingPool)
+    media_files = organizer.scanner.scan(organizer.source_path)
+
+    pipeline = organizer._iter_metadata(media_files)
+    next(pipeline)
+    pipeline.close()
+
+    assert shutdowns == [True]
+
+
+def test_broken_worker_pool_falls_back_in_process(organizer, monkeypatch):
+    """Test that losing the worker pool reads the remaining files in-process."""
+    from concurrent.futures.process import BrokenProcessPool
+
+    class BrokenPool:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def map(self, fn, chunks):
+            raise BrokenProcessPool("worker died")
+            yield
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            pass
+
+    monkeypatch.setattr(organizer_module, "PARALLEL_METADATA_MIN_FILES", 0)
+    monkeypatch.setattr(organizer_module, "METADATA_WORKERS", 2)
+    monkeypatch.setattr(organizer_module, "ProcessPoolExecutor", BrokenPool)
+    media_files = organizer.scanner.scan(organizer.source_path)
+
+    metadata_list = organizer._extract_all(media_files)
+
+    assert [m.file_path for m in metadata_list] == media_files
+
+
+def test_transaction_log_saved_when_run_aborts(tmp_path, monkeypatch):
+    """Test that moves made before an unexpected failure are still logged."""
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "a.jpg").write_bytes(b"jpeg")
+
+    org = PhotoOrganizer(
+        source_path=source,
+        destination_path=tmp_path / "dest",
+        location_intelligence=LocationIntelligence(cache=GeocodingCache(cache_path=':memory:')),
+        mode='move',
+        verify=False
+    )
+
+    def iter_then_fail(media_files):
+        yield from PhotoOrganizer._iter_metadata(org, media_files)
+        raise RuntimeError("metadata pipeline failed")
+
+    monkeypatch.setattr(org, "_iter_metadata", iter_then_fail)
+
+    with pytest.raises(RuntimeError):
+        org.organize()
+    org.location_intelligence.close()
+
+    assert org.transaction_log.log_file.exists()
+
+
+def test_preview_flushes_geocoding_cache(organizer, monkeypatch):
+    """Test that locations geocoded for a preview are committed to the cache."""
+    cache = organizer.location_intelligence.cache
+    flushed = []
+    monkeypatch.setattr(cache, "flush", lambda: flushed.append(True))
+
+    organizer.preview()
+
+    assert flushed
+
+
+def test_api_calls_count_only_geocoding_lookups(organizer, monkeypatch):
+    """Test that files sharing a location are not each counted as an API call."""
+    from types import SimpleNamespace
+    from src.metadata import MediaMetadata
+
+    class Geocoder:
+        def reverse(self, coords, language=None):
+            return SimpleNamespace(raw={'address': {'country': 'Norway'}})
+
+    intel = organizer.location_intelligence
+    intel._nominatim = Geocoder()
+    intel.min_api_interval = 0
+    media_files = organizer.scanner.scan(organizer.source_path)
+
+    def iter_metadata(files):
+        metadata_list = []
+        for file_path in files:
+            metadata = MediaMetadata(file_path)
+            metadata.gps_coords = (59.9139, 10.7522)
+            metadata_list.append(metadata)
+        yield files, metadata_list
+
+    monkeypatch.setattr(organizer, "_iter_metadata", iter_metadata)
+
+    stats = organizer.organize()
+
+    assert len(media_files) == 3
+    assert stats.api_calls_made == 1
+
+
+def test_existing_destination_files_are_duplicates(tmp_path):
+    """Test that files already in the destination are detected from the index."""
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "a.jpg").write_bytes(b"jpeg")
+
+    def run():
+        org = PhotoOrganizer(
+            source_path=source,
+            destination_path=tmp_path / "dest",
+            location_intelligence=LocationIntelligence(cache=GeocodingCache(cache_path=':memory:')),
+            mode='copy'
+        )
+        stats = org.organize()
+        org.location_intelligence.close()
+        return stats
+
+    assert run().duplicates_found == 0
+    assert run().duplicates_found == 1
+    assert len(list((tmp_path / "dest").rglob("*.jpg"))) == 2
+
+
+def _organizer_with_cased_collision(tmp_path, mode):
+    """Organizer for one source file whose target already exists in lower case."""
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "A.JPG").write_bytes(b"new")
+
+    org = PhotoOrganizer(
+        source_path=source,
+        destination_path=tmp_path / "dest",
+        location_intelligence=LocationIntelligence(cache=GeocodingCache(cache_path=':memory:')),
+        mode=mode,
+        verify=False
+    )
+    metadata = org.metadata_extractor.extract(source / "A.JPG")
+    target = org.path_generator.generate_path(metadata, None)
+    target.parent.mkdir(parents=True)
+    existing = target.with_name(target.name.lower())
+    existing.write_bytes(b"existing")
+    return org, target, existing
+
+
+def test_case_insensitive_destination_collision(tmp_path, monkeypatch):
+    """Test that a differently-cased existing file is not overwritten by a move."""
+    import os
+
+    # Behave like APFS/NTFS defaults: names match regardless of case
+    def case_insensitive_exists(self, *args, **kwargs):
+        try:
+            return any(name.casefold() == self.name.casefold() for name in os.listdir(self.parent))
+        except OSError:
+            return False
+
+    org, target, existing = _organizer_with_cased_collision(tmp_path, 'move')
+    monkeypatch.setattr(Path, "exists", case_insensitive_exists)
+    stats = org.organize()
+    org.location_intelligence.close()
+
+    assert stats.duplicates_found == 1
+    assert existing.read_bytes() == b"existing"
+    assert target.with_name(f"{target.stem}_1{target.suffix}").read_bytes() == b"new"
+
+
+def test_case_only_difference_is_not_duplicate_on_case_sensitive_fs(tmp_path):
+    """Test that an index hit is confirmed against the real filesystem."""
+    org, target, existing = _organizer_with_cased_collision(tmp_path, 'copy')
+    stats = org.organize()
+    org.location_intelligence.close()
+
+    assert stats.duplicates_found == 0
+    assert existing.read_bytes() == b"existing"
+    assert target.read_bytes() == b"new"
@@ -3,8 +3,6 @@ Tests for path generator with filename patterns.
 """
 import pytest
 from pathlib import Path
-import tempfile
-import shutil
 from datetime import datetime
 
 from src.path_generator import PathGenerator
@@ -12,17 +10,17 @@ from src.metadata import MediaMetadata
 
 
 @pytest.fixture
-def temp_dest_dir():
+def temp_dest_dir(tmp_path):
     """Create a temporary destination directory."""
-    temp_dir = Path(tempfile.mkdtemp())
-    yield temp_dir
-    shutil.rmtree(temp_dir)
+    temp_dir = tmp_path / "library"
+    temp_dir.mkdir()
+    return temp_dir
 
 
-@pytest.fixture
-def sample_metadata(tmp_path):
-    """Create sample metadata for testing."""
-    test_file = tmp_path / "IMG_1234.jpg"
+@pytest.fixture(scope="session")
+def sample_metadata(tmp_path_factory):
+    """Create sample metadata for testing (shared; tests only read it)."""
+    test_file = tmp_path_factory.mktemp("metadata_seed") / "IMG_1234.jpg"
     test_file.touch()
 
     metadata = MediaMetadata(test_file)
@@ -130,21 +128,21 @@ def test_ensure_unique_without_counter_placeholder(temp_dest_dir, sample_metadat
     assert path2.name == "2023-06-15_IMG_1234_1.jpg"
 
 
-def test_pattern_preserves_extension(temp_dest_dir, tmp_path):
+@pytest.mark.parametrize("ext", ['.jpg', '.png', '.MP4', '.HEIC'])
+def test_pattern_preserves_extension(temp_dest_dir, tmp_path, ext):
     """Test that extension is preserved correctly."""
-    for ext in ['.jpg', '.png', '.MP4', '.HEIC']:
-        test_file = tmp_path / f"test{ext}"
-        test_file.touch()
+    test_file = tmp_path / f"test{ext}"
+    test_file.touch()
 
-        metadata = MediaMetadata(test_file)
-        metadata.date_taken = datetime(2023, 1, 1)
+    metadata = MediaMetadata(test_file)
+    metadata.date_taken = datetime(2023, 1, 1)
 
-        generator = PathGenerator(temp_dest_dir, filename_pattern="{original_name}_{date}{ext}")
+    generator = PathGenerator(temp_dest_dir, filename_pattern="{original_name}_{date}{ext}")
 
-        path = generator.generate_path(metadata, "Test")
+    path = generator.generate_path(metadata, "Test")
 
-        assert path.suffix == ext
-        assert path.name == f"test_2023-01-01{ext}"
+    assert path.suffix == ext
+    assert path.name == f"test_2023-01-01{ext}"
 
 
 def test_pattern_with_special_characters(temp_dest_dir, sample_metadata):
@@ -156,17 +154,90 @@ def test_pattern_with_special_characters(temp_dest_dir, sample_metadata):
     assert path.name == "2023-06-15--IMG_1234.jpg"
 
 
-def test_multiple_patterns(temp_dest_dir, sample_metadata):
+@pytest.mark.parametrize("pattern, expected_name", [
+    ("{date}_{original_name}{ext}", "2023-06-15_IMG_1234.jpg"),
+    ("{original_name}{ext}", "IMG_1234.jpg"),
+    ("{year}{month}{day}_{original_name}{ext}", "20230615_IMG_1234.jpg"),
+    ("{year}/{month}_{original_name}{ext}", "2023/06_IMG_1234.jpg"),  # Note: includes directory separator
+])
+def test_multiple_patterns(temp_dest_dir, sample_metadata, pattern, expected_name):
     """Test generating paths with different patterns."""
-    patterns = [
-        ("{date}_{original_name}{ext}", "2023-06-15_IMG_1234.jpg"),
-        ("{original_name}{ext}", "IMG_1234.jpg"),
-        ("{year}{month}{day}_{original_name}{ext}", "20230615_IMG_1234.jpg"),
-        ("{year}/{month}_{original_name}{ext}", "2023/06_IMG_1234.jpg"),  # Note: includes directory separator
-    ]
-
-    for pattern, expected_name in patterns:
+    generator = PathGenerator(temp_dest_dir, filename_pattern=pattern)
+    path = generator.generate_path(sample_metadata, "CA")
+
+    assert path.name == expected_name or expected_name in str(path)
+
+
+def test_create_directory_remembers_created_paths(temp_dest_dir, monkeypatch):
+    """Test that a directory and its new parents are only created once."""
+    generator = PathGenerator(temp_dest_dir)
+    target = temp_dest_dir / "2023" / "06" / "CA"
+
+    assert generator.create_directory(target)
+    assert target.is_dir()
+
+    # Later calls for the directory or its parents touch the filesystem no more
+    monkeypatch.setattr(Path, "exists", lambda self: pytest.fail("unexpected stat"))
+    monkeypatch.setattr(Path, "mkdir", lambda self, **kwargs: pytest.fail("unexpected mkdir"))
+    assert generator.create_directory(target)
+    assert generator.create_directory(temp_dest_dir / "2023" / "06")
+
+
+def test_ensure_unique_probes_logarithmically(temp_dest_dir, monkeypatch):
+    """Test that many existing duplicates are skipped with few stat calls."""
+    generator = PathGenerator(temp_dest_dir)
+    target = temp_dest_dir / "IMG.jpg"
+    target.touch()
+    for counter in range(1, 301):
+        (temp_dest_dir / f"IMG_{counter}.jpg").touch()
+
+    probes = []
+    real_exists = Path.exists
+    monkeypatch.setattr(Path, "exists", lambda self: probes.append(self) or real_exists(self))
+
+    assert generator.ensure_unique_path(target).name == "IMG_301.jpg"
+    assert len(probes) < 25
+
+    # The next collision starts from the counter just handed out
+    (temp_dest_dir / "IMG_301.jpg").touch()
+    probes.clear()
+    assert generator.ensure_unique_path(target).name == "IMG_302.jpg"
+    assert len(probes) <= 3
+
+
+def test_ensure_unique_handles_files_added_after_listing(temp_dest_dir):
+    """Test that a stale directory listing never hands out an existing name."""
+    generator = PathGenerator(temp_dest_dir)
+    target = temp_dest_dir / "IMG.jpg"
+    target.touch()
+
+    assert generator.ensure_unique_path(target).name == "IMG_1.jpg"
+
+    # Placed directly (e.g. a source file already named IMG_2.jpg)
+    (temp_dest_dir / "IMG_1.jpg").touch()
+    (temp_dest_dir / "IMG_2.jpg").touch()
+
+    assert generator.ensure_unique_path(target).name == "IMG_3.jpg"
+
+
+def test_compiled_pattern_matches_str_format(temp_dest_dir):
+    """Test that the pre-parsed pattern renders exactly like str.format."""
+    values = dict(date="2023-06-15", year="2023", month="06", day="15",
+                  original_name="IMG_1234", ext=".jpg", counter="_2")
+
+    for pattern in ["{date}_{original_name}{ext}", "{{raw}}_{original_name}{counter}{ext}",
+                    "{year:>6}{ext}", "{original_name!r}{ext}", "plain"]:
         generator = PathGenerator(temp_dest_dir, filename_pattern=pattern)
-        path = generator.generate_path(sample_metadata, "CA")
+        assert generator._render(**values) == pattern.format(**values)
+
+    assert PathGenerator(temp_dest_dir, "{year:>6}{ext}")._segments is None
+
+
+def test_get_relative_path(temp_dest_dir):
+    """Test paths are made relative to the destination root."""
+    generator = PathGenerator(temp_dest_dir)
+    target = temp_dest_dir / "2023" / "06" / "Paris" / "photo.jpg"
 
-        assert path.name == expected_name or expected_name in str(path)
+    assert generator.get_relative_path(target) == Path("2023/06/Paris/photo.jpg")
+    assert generator.get_relative_path(temp_dest_dir) == Path(".")
+    assert generator.get_relative_path(Path("/elsewhere/photo.jpg")) == Path("/elsewhere/photo.jpg")
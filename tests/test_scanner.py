@@ -3,35 +3,46 @@ Tests for scanner module.
 """
 import pytest
 from pathlib import Path
-import tempfile
+import os
 import shutil
 
 from src.scanner import MediaScanner, scan_directory
 
 
-@pytest.fixture
-def temp_photo_dir():
-    """Create a temporary directory with sample files."""
-    temp_dir = Path(tempfile.mkdtemp())
+# Files of the shared sample tree, relative to its root
+_SAMPLE_FILES = [
+    "photo1.jpg",
+    "photo2.JPG",
+    "photo3.png",
+    "video1.mp4",
+    "video2.MOV",
+    "document.txt",  # Should be ignored
+    "subdir/photo4.jpeg",
+    "subdir/video3.avi",
+]
+
+
+@pytest.fixture(scope="session")
+def temp_photo_dir(tmp_path_factory):
+    """
+    Create a temporary directory with sample files.
 
-    # Create sample files
-    (temp_dir / "photo1.jpg").touch()
-    (temp_dir / "photo2.JPG").touch()
-    (temp_dir / "photo3.png").touch()
-    (temp_dir / "video1.mp4").touch()
-    (temp_dir / "video2.MOV").touch()
-    (temp_dir / "document.txt").touch()  # Should be ignored
+    Built once and shared; tests that add files use writable_photo_dir.
+    """
+    temp_dir = tmp_path_factory.mktemp("photos")
 
-    # Create subdirectory
-    subdir = temp_dir / "subdir"
-    subdir.mkdir()
-    (subdir / "photo4.jpeg").touch()
-    (subdir / "video3.avi").touch()
+    for relative in _SAMPLE_FILES:
+        file_path = temp_dir / relative
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        os.close(os.open(file_path, os.O_CREAT | os.O_WRONLY, 0o644))
 
-    yield temp_dir
+    return temp_dir
 
-    # Cleanup
-    shutil.rmtree(temp_dir)
+
+@pytest.fixture
+def writable_photo_dir(temp_photo_dir, tmp_path):
+    """Private copy of temp_photo_dir that a test may modify."""
+    return Path(shutil.copytree(temp_photo_dir, tmp_path / "photos"))
 
 
 def test_scanner_finds_all_media_files(temp_photo_dir):
@@ -141,45 +152,45 @@ def test_exclude_directory_by_name(temp_photo_dir):
         assert 'subdir' not in str(f)
 
 
-def test_exclude_multiple_patterns(temp_photo_dir):
+def test_exclude_multiple_patterns(writable_photo_dir):
     """Test excluding multiple patterns."""
     # Create another subdirectory
-    cache_dir = temp_photo_dir / ".cache"
+    cache_dir = writable_photo_dir / ".cache"
     cache_dir.mkdir()
     (cache_dir / "cached_photo.jpg").touch()
 
     scanner = MediaScanner()
-    files = scanner.scan(temp_photo_dir, recursive=True,
+    files = scanner.scan(writable_photo_dir, recursive=True,
                         exclude_patterns=['subdir', '.cache'])
 
     # Should only find files in root (5 files)
     assert len(files) == 5
 
 
-def test_exclude_glob_pattern(temp_photo_dir):
+def test_exclude_glob_pattern(writable_photo_dir):
     """Test excluding using glob patterns."""
     # Create nested structure
-    nested = temp_photo_dir / "2023" / "thumbnails"
+    nested = writable_photo_dir / "2023" / "thumbnails"
     nested.mkdir(parents=True)
     (nested / "thumb.jpg").touch()
 
     scanner = MediaScanner()
-    files = scanner.scan(temp_photo_dir, recursive=True,
+    files = scanner.scan(writable_photo_dir, recursive=True,
                         exclude_patterns=['*/thumbnails/*'])
 
     # Should not include thumbnail
     assert all('thumbnails' not in str(f) for f in files)
 
 
-def test_exclude_hidden_directories(temp_photo_dir):
+def test_exclude_hidden_directories(writable_photo_dir):
     """Test excluding hidden directories (starting with dot)."""
     # Create hidden directory
-    hidden_dir = temp_photo_dir / ".hidden"
+    hidden_dir = writable_photo_dir / ".hidden"
     hidden_dir.mkdir()
     (hidden_dir / "secret.jpg").touch()
 
     scanner = MediaScanner()
-    files = scanner.scan(temp_photo_dir, recursive=True,
+    files = scanner.scan(writable_photo_dir, recursive=True,
                         exclude_patterns=['.hidden'])
 
     # Should not include files from hidden directory
@@ -195,10 +206,10 @@ def test_exclude_pattern_with_instance_init(temp_photo_dir):
     assert len(files) == 5
 
 
-def test_exclude_pattern_merge(temp_photo_dir):
+def test_exclude_pattern_merge(writable_photo_dir):
     """Test that instance and method exclude patterns are merged."""
     # Create cache directory
-    cache_dir = temp_photo_dir / ".cache"
+    cache_dir = writable_photo_dir / ".cache"
     cache_dir.mkdir()
     (cache_dir / "cached.jpg").touch()
 
@@ -206,7 +217,7 @@ def test_exclude_pattern_merge(temp_photo_dir):
     scanner = MediaScanner(exclude_patterns=['subdir'])
 
     # Add another pattern in scan call
-    files = scanner.scan(temp_photo_dir, recursive=True,
+    files = scanner.scan(writable_photo_dir, recursive=True,
                         exclude_patterns=['.cache'])
 
     # Should exclude both 'subdir' and '.cache'
@@ -226,16 +237,16 @@ def test_exclude_no_match(temp_photo_dir):
     assert len(files) == 7
 
 
-def test_exclude_wildcard_pattern(temp_photo_dir):
+def test_exclude_wildcard_pattern(writable_photo_dir):
     """Test excluding with wildcard patterns."""
     # Create multiple cache-like directories
-    (temp_photo_dir / "cache1").mkdir()
-    (temp_photo_dir / "cache1" / "photo.jpg").touch()
-    (temp_photo_dir / "cache2").mkdir()
-    (temp_photo_dir / "cache2" / "photo.jpg").touch()
+    (writable_photo_dir / "cache1").mkdir()
+    (writable_photo_dir / "cache1" / "photo.jpg").touch()
+    (writable_photo_dir / "cache2").mkdir()
+    (writable_photo_dir / "cache2" / "photo.jpg").touch()
 
     scanner = MediaScanner()
-    files = scanner.scan(temp_photo_dir, recursive=True,
+    files = scanner.scan(writable_photo_dir, recursive=True,
                         exclude_patterns=['cache*'])
 
     # Should exclude both cache1 and cache2
@@ -248,3 +259,99 @@ def test_exclude_convenience_function(temp_photo_dir):
                           exclude_patterns=['subdir'])
 
     assert len(files) == 5
+
+
+def test_scanner_matches_any_extension_case(writable_photo_dir):
+    """Test that mixed-case extensions match and extensionless names do not."""
+    (writable_photo_dir / "photo5.Jpg").touch()
+    (writable_photo_dir / "jpg").touch()
+    (writable_photo_dir / "album.jpg").mkdir()
+
+    files = MediaScanner().scan(writable_photo_dir, recursive=False)
+
+    assert writable_photo_dir / "photo5.Jpg" in files
+    assert writable_photo_dir / "jpg" not in files
+    assert writable_photo_dir / "album.jpg" not in files
+    assert files == sorted(files)
+
+
+def test_compiled_excludes_match_like_fnmatch():
+    """Test that the name set plus union regex agree with fnmatch for every pattern."""
+    import fnmatch
+    from src.scanner import _compile_excludes
+
+    patterns = ('thumbnails', '*/cache/*', 'tmp?', '[._]*')
+    names, regex = _compile_excludes(patterns)
+
+    for text in ['thumbnails', 'a/cache/b.jpg', 'tmp1', 'tmp12', '.git', '_x', 'photo.jpg']:
+        expected = any(fnmatch.fnmatch(text, pattern) for pattern in patterns)
+        assert (text in names or regex.match(text) is not None) == expected
+
+    assert names == {'thumbnails'}
+    assert _compile_excludes(patterns) is _compile_excludes(patterns)
+    assert _compile_excludes(()) == (frozenset(), None)
+
+    # Plain names never need the regex engine
+    assert _compile_excludes(('.cache', 'thumbnails')) == (frozenset({'.cache', 'thumbnails'}), None)
+
+
+def test_exclude_patterns_apply_below_source_only(tmp_path):
+    """Test that the source directory's own name and ancestors are not matched."""
+    source = tmp_path / "cache" / "photos"
+    (source / "cache").mkdir(parents=True)
+    (source / "a.jpg").touch()
+    (source / "cache" / "b.jpg").touch()
+
+    files = MediaScanner().scan(source, exclude_patterns=['cache', 'photos'])
+
+    assert files == [source / "a.jpg"]
+
+
+def test_scanner_unsorted_returns_same_files(temp_photo_dir):
+    """Test that skipping the sort changes only the order."""
+    files = scan_directory(temp_photo_dir, sort=False)
+
+    assert sorted(files) == scan_directory(temp_photo_dir)
+    assert len(set(files)) == len(files)
+
+
+def test_scan_iter_streams_files(temp_photo_dir):
+    """Test that scan_iter yields the same files as scan, lazily."""
+    scanner = MediaScanner()
+    files = scanner.scan_iter(temp_photo_dir)
+
+    first = next(files)
+    assert sorted([first, *files]) == scanner.scan(temp_photo_dir)
+
+    # Invalid sources are reported on the call, not on first iteration
+    with pytest.raises(FileNotFoundError):
+        scanner.scan_iter(Path("/nonexistent/path"))
+
+
+def test_exclude_patterns_fixed_when_scan_starts(temp_photo_dir):
+    """Test that a running scan keeps the patterns it was started with."""
+    scanner = MediaScanner(exclude_patterns=['subdir'])
+    files = scanner.scan_iter(temp_photo_dir)
+
+    scanner.exclude_patterns = []
+    names = {f.name for f in files}
+
+    assert 'photo4.jpeg' not in names
+    assert 'photo4.jpeg' in {f.name for f in scanner.scan(temp_photo_dir)}
+
+
+def test_skip_hidden_directories(writable_photo_dir):
+    """Test that skip_hidden prunes dot-directories without any pattern."""
+    (writable_photo_dir / ".git").mkdir()
+    (writable_photo_dir / ".git" / "blob.jpg").touch()
+    (writable_photo_dir / "subdir" / ".thumbs").mkdir()
+    (writable_photo_dir / "subdir" / ".thumbs" / "thumb.jpg").touch()
+    (writable_photo_dir / ".visible_name.jpg").touch()
+
+    names = {f.name for f in MediaScanner(skip_hidden=True).scan(writable_photo_dir)}
+
+    assert 'blob.jpg' not in names
+    assert 'thumb.jpg' not in names
+    # Only directories are skipped
+    assert '.visible_name.jpg' in names
+    assert 'blob.jpg' in {f.name for f in scan_directory(writable_photo_dir)}
@@ -0,0 +1,122 @@
+"""
+Tests for utils module.
+"""
+import os
+
+from src.utils import calculate_file_hash, clone_file, copy_file_with_hash, verify_file_integrity
+
+
+def test_copy_file_with_hash(tmp_path):
+    """Test that the copy matches the source and the digest is the source hash."""
+    source = tmp_path / "source.jpg"
+    source.write_bytes(os.urandom(300_000))
+    os.utime(source, (1_600_000_000, 1_600_000_000))
+    destination = tmp_path / "copy.jpg"
+
+    digest = copy_file_with_hash(source, destination, chunk_size=65536)
+
+    assert destination.read_bytes() == source.read_bytes()
+    assert digest == calculate_file_hash(source)
+    assert destination.stat().st_mtime == source.stat().st_mtime
+
+
+def test_verify_file_integrity_with_known_digest(tmp_path):
+    """Test verification against a precomputed source digest."""
+    source = tmp_path / "source.jpg"
+    source.write_bytes(b"original")
+    destination = tmp_path / "copy.jpg"
+    digest = copy_file_with_hash(source, destination)
+
+    assert verify_file_integrity(source, destination, digest)
+
+    destination.write_bytes(b"corrupte")
+    assert not verify_file_integrity(source, destination, digest)
+
+
+def test_verify_file_integrity_compares_contents(tmp_path, monkeypatch):
+    """Test block-by-block verification when no digest is known."""
+    from src import utils
+
+    monkeypatch.setattr(utils, "_COMPARE_BLOCK_SIZE", 4)
+    source = tmp_path / "source.jpg"
+    source.write_bytes(b"0123456789")
+    destination = tmp_path / "copy.jpg"
+
+    destination.write_bytes(b"0123456789")
+    assert verify_file_integrity(source, destination)
+
+    destination.write_bytes(b"0123456780")
+    assert not verify_file_integrity(source, destination)
+
+
+def test_clone_file_succeeds_or_leaves_nothing(tmp_path):
+    """Test that a clone is an exact copy, and a failed clone leaves no file."""
+    source = tmp_path / "source.mov"
+    source.write_bytes(os.urandom(10_000))
+    destination = tmp_path / "clone.mov"
+
+    if clone_file(source, destination):
+        assert destination.read_bytes() == source.read_bytes()
+    else:
+        assert not destination.exists()
+
+    # Never overwrites an existing file
+    destination.write_bytes(b"keep")
+    assert not clone_file(source, destination)
+    assert destination.read_bytes() == b"keep"
+
+
+def test_statistics_caps_stored_errors(capsys):
+    """Test that only the first errors are kept but all are counted."""
+    from src.utils import Statistics
+
+    stats = Statistics()
+    stats.MAX_ERRORS = 3
+    for i in range(10):
+        stats.record_failed(f"error {i}")
+
+    assert stats.failed_files == 10
+    assert stats.errors == ["error 0", "error 1", "error 2"]
+    assert stats.get_summary()['errors_truncated'] == 7
+
+    stats.print_summary()
+    output = capsys.readouterr().out
+    assert "Errors (10)" in output
+    assert "... and 7 more" in output
+
+
+def test_transaction_log_appends_json_lines(tmp_path):
+    """Test that records are appended in batches and survive across runs."""
+    from src.utils import TransactionLog
+
+    log_file = tmp_path / "transaction_log.jsonl"
+    log = TransactionLog(log_file)
+    log.FLUSH_EVERY = 2
+
+    log.log_operation('move', tmp_path / "a.jpg", tmp_path / "out" / "a.jpg", True)
+    assert not log_file.exists()
+    log.log_operation('move', tmp_path / "b.jpg", tmp_path / "out" / "b.jpg", True)
+    assert len(log_file.read_text().splitlines()) == 2
+
+    log.log_operation('copy', tmp_path / "c.jpg", tmp_path / "out" / "c.jpg", False, "disk full")
+    log.save()
+
+    # A later run appends to the same file
+    second = TransactionLog(log_file)
+    second.log_operation('move', tmp_path / "d.jpg", tmp_path / "out" / "d.jpg", True)
+    second.save()
+
+    records = TransactionLog(log_file).load()
+    assert [r['source'] for r in records] == [str(tmp_path / f"{c}.jpg") for c in "abcd"]
+    assert records[2]['error'] == "disk full"
+
+
+def test_transaction_log_loads_legacy_array(tmp_path):
+    """Test that logs written as a single JSON array can still be read."""
+    import json
+    from src.utils import TransactionLog
+
+    log_file = tmp_path / "transaction_log.json"
+    log_file.write_text(json.dumps([{'operation': 'move', 'success': True}], indent=2))
+
+    assert TransactionLog(log_file).load() == [{'operation': 'move', 'success': True}]
@@ -4,31 +4,35 @@ Dependency Verification Script for Photo Organizer
 Tests all required packages and external tools
 """
 
+import importlib.util
+import io
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 def test_imports():
-    """Test that all required packages can be imported"""
+    """Test that all required packages are installed"""
     print("🔍 Testing Python package imports...\n")
     
+    # Module names only: find_spec checks availability without running the package
     tests = {
-        "PIL (Pillow)": lambda: __import__("PIL"),
-        "pillow_heif": lambda: __import__("pillow_heif"),
-        "geopy": lambda: __import__("geopy"),
-        "yaml (PyYAML)": lambda: __import__("yaml"),
-        "tqdm": lambda: __import__("tqdm"),
-        "requests": lambda: __import__("requests"),
-        "exiftool": lambda: __import__("exiftool"),
-        "mutagen": lambda: __import__("mutagen"),
+        "PIL (Pillow)": "PIL",
+        "pillow_heif": "pillow_heif",
+        "geopy": "geopy",
+        "yaml (PyYAML)": "yaml",
+        "tqdm": "tqdm",
+        "requests": "requests",
+        "exiftool": "exiftool",
+        "mutagen": "mutagen",
     }
     
     results = {}
-    for name, test_func in tests.items():
-        try:
-            test_func()
+    for name, module in tests.items():
+        if importlib.util.find_spec(module) is not None:
             results[name] = "✅ OK"
-        except ImportError as e:
-            results[name] = f"❌ FAILED: {e}"
+        else:
+            results[name] = f"❌ FAILED: No module named '{module}'"
     
     for name, result in results.items():
         print(f"  {name:<20} {result}")
@@ -49,17 +53,12 @@ def test_exiftool():
             print(f"  ExifTool version:  {version}")
             print(f"  ExifTool path:     {executable}")
             
-            # Test on a simple file (create a dummy text file)
-            test_file = Path("/tmp/test_exif.txt")
-            test_file.write_text("test")
-            
+            # Test on a file that always exists (this script) instead of writing one
             try:
-                metadata = et.get_metadata([str(test_file)])
+                metadata = et.get_metadata([str(Path(__file__).resolve())])
                 print(f"  Metadata test:     ✅ OK")
             except Exception as e:
                 print(f"  Metadata test:     ⚠️  Warning: {e}")
-            finally:
-                test_file.unlink(missing_ok=True)
             
             return True
             
@@ -141,6 +140,48 @@ def test_video_metadata():
         print(f"  ❌ FAILED: {e}")
         return False
 
+class _PerThreadStdout:
+    """sys.stdout stand-in that routes each check's output to its own buffer"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def write(self, text):
+        return getattr(self._local, "buffer", self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        # encoding, isatty(), fileno() and the rest come from the real stream
+        return getattr(self.stream, name)
+
+
+def run_checks(checks):
+    """Run independent checks concurrently, printing each one's output in order"""
+    stdout = _PerThreadStdout(sys.stdout)
+
+    def run(check):
+        stdout._local.buffer = io.StringIO()
+        try:
+            return check(), stdout._local.buffer.getvalue()
+        finally:
+            del stdout._local.buffer
+
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            futures = {name: executor.submit(run, check) for name, check in checks.items()}
+    finally:
+        sys.stdout = stdout.stream
+
+    results = {}
+    for name, future in futures.items():
+        results[name], output = future.result()
+        print(output, end="")
+    return results
+
 def print_summary(results):
     """Print test summary"""
     print("\n" + "="*60)
@@ -172,13 +213,15 @@ def main():
     
     print(f"Python version: {sys.version}\n")
     
-    results = {
-        "Package Imports": test_imports(),
-        "ExifTool Binary": test_exiftool(),
-        "Image Formats": test_image_formats(),
-        "Geocoding": test_geocoding(),
-        "Video Metadata": test_video_metadata(),
-    }
+    # The checks are independent and mostly wait on subprocesses or the
+    # network, so they run side by side
+    results = run_checks({
+        "Package Imports": test_imports,
+        "ExifTool Binary": test_exiftool,
+        "Image Formats": test_image_formats,
+        "Geocoding": test_geocoding,
+        "Video Metadata": test_video_metadata,
+    })
     
     success = print_summary(results)
     